@@ -1,26 +1,162 @@
+import asyncio
 import os
 import sys
+from typing import Dict, List, Optional
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from strands import Agent
-from prompts.coordinator_prompt import COORDINATOR_SYSTEM_PROMPT
+from strands.tools.executors import ConcurrentToolExecutor
 from multi_agents.flight_agent import flight_agent
 from multi_agents.policy_agent import policy_agent
 from multi_agents.support_agent import support_agent
 from multi_agents.general_agent import generat_agent
+from multi_agents.router import intent_router
+from multi_agents.support_agent import _analyze_complexity
 from model.moonshot import get_model
+from multi_agents.agent_factory import agent_pool, run_agent
+from utils.event_loop import agent_loop
+from utils.conversation import ConversationMemory
+from utils.embeddings import embedding_service
+from utils.prompts import prompt_manager
+from utils.sessions import Session, session_manager
+from utils.streaming import emit, streaming_callback
+
+# Load the embedding model in the background so startup doesn't wait on torch
+if os.getenv('EMBEDDING_WARMUP', 'true').lower() == 'true':
+    embedding_service.warm_up()
+
+# 0 makes coordinator calls deterministic and so cacheable, at the cost of more uniform answers
+COORDINATOR_TEMPERATURE = float(os.getenv('COORDINATOR_TEMPERATURE', 0.7))
+
+
+def _build_coordinator() -> Agent:
+    return Agent(
+        name="coordinator",
+        model=get_model(temperature=COORDINATOR_TEMPERATURE),
+        system_prompt=prompt_manager.system_prompt('coordinator'),
+        callback_handler=streaming_callback("coordinator"),
+        tools=[flight_agent, policy_agent, support_agent, generat_agent],
+        # Tool calls emitted in the same turn run in parallel
+        tool_executor=ConcurrentToolExecutor()
+    )
+
+
+# Coordinators are leased per call; a session's state lives in its memory, not in the agent,
+# so concurrent users run in parallel on the shared model client and tools
+coordinator_pool = agent_pool('coordinator', _build_coordinator)
+
+ROUTER_ENABLED = os.getenv('ROUTER_ENABLED', 'true').lower() == 'true'
+FANOUT_ENABLED = os.getenv('FANOUT_ENABLED', 'true').lower() == 'true'
+FANOUT_TOOL_TIMEOUT = float(os.getenv('FANOUT_TOOL_TIMEOUT', 60))
+SPECIALISTS = {
+    'flight': flight_agent,
+    'policy': policy_agent,
+    'support': support_agent,
+    'general': generat_agent
+}
+# Specialists that can book, cancel or open tickets; never invite a retry while one may still be running
+SIDE_EFFECT_INTENTS = {'flight', 'support'}
+
+
+async def _gather_specialists(sub_queries: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Run specialists concurrently on the agent loop; those still running after the timeout map to None"""
+    # Tasks inherit the caller's context, so each specialist's events reach the caller's stream
+    tasks = {intent: asyncio.ensure_future(SPECIALISTS[intent](sub_query))
+             for intent, sub_query in sub_queries.items()}
+    # Late specialists are left to finish rather than cancelled mid-call
+    await asyncio.wait(tasks.values(), timeout=FANOUT_TOOL_TIMEOUT)
+    return {intent: task.result() if task.done() and task.exception() is None else None
+            for intent, task in tasks.items()}
+
+
+def _fan_out(query: str, intents: List[str], memory: Optional[ConversationMemory] = None) -> Optional[str]:
+    """Run independent specialists concurrently and merge their answers in request order"""
+    sub_queries = intent_router.split_by_intent(query, intents)
+    if memory is not None:
+        sub_queries = {intent: memory.with_context(sub_query) for intent, sub_query in sub_queries.items()}
+    results = agent_loop.run(_gather_specialists(sub_queries))
+
+    answers = [answer for answer in results.values() if answer is not None]
+    missing = [intent for intent, answer in results.items() if answer is None]
+    # A late specialist keeps running, so one that books or files a ticket may still do so
+    pending = [intent for intent in missing if intent in SIDE_EFFECT_INTENTS]
+    retry = [intent for intent in missing if intent not in SIDE_EFFECT_INTENTS]
+
+    if not answers and not pending:
+        return None
+    if pending:
+        answers.append(f"The {' and '.join(pending)} part of your request is still being processed and may "
+                       f"still go through. Please check its status before asking again, so it isn't done twice.")
+    if retry:
+        answers.append(f"I couldn't get the {' and '.join(retry)} part of your request in time. "
+                       f"Please ask about it again in a moment.")
+    return "\n\n".join(answers)
+
+
+def handle_query(query: str, memory: Optional[ConversationMemory] = None) -> str:
+    """Answer a user message, skipping the coordinator LLM when the router can dispatch it.
+
+    ``memory`` holds the session's conversation; without it the message is answered on its own.
+    """
+    decision = {'intent': None}
+    if ROUTER_ENABLED:
+        try:
+            decision = intent_router.route(query)
+        except Exception as e:
+            print(f"Routing error: {e}")
+    intent = decision['intent']
+
+    intents = [intent] if intent is not None else []
+    if decision.get('method') == 'multi_intent' and FANOUT_ENABLED:
+        intents = decision['candidates']
+        # Greetings tacked onto a real request need no agent of their own
+        if len(intents) > 1 and 'general' in intents:
+            intents = [i for i in intents if i != 'general']
+    # The support agent only answers messages that need a ticket; the rest need the coordinator
+    if 'support' in intents and not _analyze_complexity(query)["needs_ticket"]:
+        intents = []
+
+    # Agents whose tokens make up the answer; with several, only the merged result is final
+    emit('route', agents=[f"{i}_agent" for i in intents] or ["coordinator"])
+    # Specialists get the same slots and summary as the coordinator, so "cancel it" still
+    # resolves to the booking mentioned earlier
+    if len(intents) == 1:
+        prompt = memory.with_context(query) if memory is not None else query
+        answer = agent_loop.run(SPECIALISTS[intents[0]](prompt))
+    elif intents:
+        answer = _fan_out(query, intents, memory)
+    else:
+        answer = None
+
+    if answer is None:
+        if intents:
+            emit('route', agents=["coordinator"])
+        with coordinator_pool.lease() as coordinator:
+            # Bounded recent turns as history; slots and summary travel with the message
+            coordinator.messages = memory.messages() if memory is not None else []
+            prompt = memory.with_context(query) if memory is not None else query
+            answer = str(run_agent(coordinator, prompt))
+
+    # Fast-routed turns are recorded too, so follow-ups that reach the coordinator have context
+    if memory is not None:
+        memory.add_turn(query, answer)
+    return answer
+
+
+def handle_session_query(query: str, session: Session) -> str:
+    """Answer one turn of a managed session and persist it"""
+    with session_manager.turn(session):
+        answer = handle_query(query, session.memory)
+        session.record(query, answer)
+        session_manager.save(session)
+    return answer
 
-airline_agent = Agent(
-    model=get_model(),
-    system_prompt=COORDINATOR_SYSTEM_PROMPT,
-    callback_handler=None,
-    tools=[flight_agent, policy_agent, support_agent, generat_agent]
-)
 
 if __name__ == "__main__":
     print("\n Airline Assistant Agent 📁\n")
     print("Type 'exit' to quit.")
+    session = session_manager.create()
 
     # Interactive loop
     while True:
@@ -30,13 +166,10 @@ if __name__ == "__main__":
                 print("\nGoodbye! 👋")
                 break
 
-            response = airline_agent(
-                user_input,
-            )
+            response = handle_session_query(user_input, session)
 
             # Extract and print only the relevant content from the specialized agent's response
-            content = str(response)
-            print(content)
+            print(response)
 
         except KeyboardInterrupt:
             print("\n\nExecution interrupted. Exiting...")
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from airline_nexus import handle_session_query
+from utils.embeddings import embedding_service
+from utils.jobs import Job, JobQueueFullError, JobRunner
+from utils.prompts import prompt_manager
+from utils.sessions import Session, session_manager
+
+load_dotenv()
+
+REQUEST_TIMEOUT = float(os.getenv('API_REQUEST_TIMEOUT', 120))
+RETRY_AFTER_SECONDS = 5
+
+# Per worker process; the cap bounds in-flight agent calls, the queue bounds waiting ones
+job_runner = JobRunner(
+    handle_session_query,
+    max_workers=int(os.getenv('API_MAX_CONCURRENT_REQUESTS', 16)),
+    max_queue=int(os.getenv('API_MAX_QUEUED_REQUESTS', 64))
+)
+
+app = FastAPI(title="AirlineNexus API")
+
+
+class ChatRequest(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+
+
+def _get_session(session_id: Optional[str]) -> Session:
+    """A new session without an id; an unknown id is a 404, never a fresh empty session"""
+    if session_id is None:
+        return session_manager.create()
+    session = session_manager.get(session_id, create=False)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+def _submit(session: Session, message: str) -> Job:
+    try:
+        # The handler answers the turn under the session's lock and records it in the transcript
+        return job_runner.submit(message, session=session)
+    except JobQueueFullError:
+        raise HTTPException(status_code=503, detail="Server busy, retry shortly",
+                            headers={'Retry-After': str(RETRY_AFTER_SECONDS)})
+
+
+async def _job_result(job: Job) -> str:
+    async for event in job:
+        if event['type'] == 'error':
+            raise HTTPException(status_code=500, detail=event['message'])
+        if event['type'] == 'done':
+            return event['content']
+
+
+@app.post("/chat")
+async def chat(request: ChatRequest) -> Dict[str, Any]:
+    session = _get_session(request.session_id)
+    job = _submit(session, request.message)
+    try:
+        answer = await asyncio.wait_for(_job_result(job), REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Only this wait is abandoned; the job's worker thread finishes in the background
+        raise HTTPException(status_code=504, detail="The assistant took too long to answer")
+    return {'session_id': session.id, 'answer': answer}
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """Server-sent events: route, agent_start/agent_end, tool and token events, then done or error"""
+    session = _get_session(request.session_id)
+    # Rejected before the stream starts, so a busy server still answers with a plain 503
+    job = _submit(session, request.message)
+
+    async def events() -> AsyncIterator[str]:
+        deadline = time.monotonic() + REQUEST_TIMEOUT
+        yield _sse('session', {'session_id': session.id})
+        cursor = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield _sse('error', {'message': "The assistant took too long to answer"})
+                return
+            batch, cursor = await job.await_events(cursor, remaining)
+            for event in batch:
+                yield _sse(event['type'], event)
+                if event['type'] in ('done', 'error'):
+                    return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={'Cache-Control': 'no-cache'})
+
+
+def _sse(event_type: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/sessions")
+async def create_session() -> Dict[str, Any]:
+    return _get_session(None).to_dict()
+
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str) -> Dict[str, Any]:
+    return _get_session(session_id).to_dict()
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str) -> Dict[str, Any]:
+    if not session_manager.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {'session_id': session_id, 'deleted': True}
+
+
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    """Liveness: the process is up and serving requests"""
+    return {'status': 'ok'}
+
+
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """Readiness: the embedding model is loaded and the request queue has room"""
+    stats = job_runner.stats()
+    saturated = stats['queued'] >= job_runner.max_queue
+    model_loaded = embedding_service.is_loaded
+    body = {
+        'ready': model_loaded and not saturated,
+        'embedding_model_loaded': model_loaded,
+        'jobs': stats,
+        'sessions': session_manager.stats()
+    }
+    return JSONResponse(body, status_code=200 if body['ready'] else 503)
+
+
+@app.get("/usage")
+async def usage() -> Dict[str, Any]:
+    """Model calls and input/output tokens per agent since this worker started"""
+    return {'prompt_variant': prompt_manager.variant, 'agents': prompt_manager.usage_stats()}
+
+
+if __name__ == "__main__":
+    # Each worker is a separate process with its own agent stack and live sessions. Workers
+    # share one socket, so a session's turns land on any of them; more than one worker
+    # needs SESSION_STORE_PATH, which all of them then read and write
+    workers = int(os.getenv('API_WORKERS', 2 if session_manager.store is not None else 1))
+    if workers > 1 and session_manager.store is None:
+        sys.exit("API_WORKERS > 1 needs SESSION_STORE_PATH, or sessions are lost between workers")
+    uvicorn.run(
+        "api_server:app",
+        host=os.getenv('API_HOST', '0.0.0.0'),
+        port=int(os.getenv('API_PORT', 8080)),
+        workers=workers,
+        timeout_keep_alive=30
+    )
@@ -1,12 +1,28 @@
 import os
+import random
+import time
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker
 from tidb_vector.integrations import TiDBVectorClient
 
 load_dotenv()
 
+# MySQL/TiDB errors where the whole transaction can safely be replayed:
+# lock wait timeout, deadlock, TiDB write conflict / retryable txn errors
+RETRYABLE_ERROR_CODES = {1205, 1213, 8002, 8022, 9007}
+DUPLICATE_KEY_ERROR_CODE = 1062
+
+
+def get_error_code(error):
+    """MySQL error code of a SQLAlchemy DBAPIError, if any"""
+    orig = getattr(error, 'orig', None)
+    if orig is not None and orig.args and isinstance(orig.args[0], int):
+        return orig.args[0]
+    return None
+
 
 class TiDBConfig:
     def __init__(self):
@@ -41,6 +57,17 @@ class DatabaseManager:
             result = conn.execute(text(query), params or {})
             return result.fetchall()
 
+    def run_in_transaction(self, work, retry_codes=RETRYABLE_ERROR_CODES, max_retries=5, base_delay=0.05):
+        """Run work(conn) in one transaction, replaying it with jittered backoff on retryable errors"""
+        for attempt in range(max_retries + 1):
+            try:
+                with self.engine.begin() as conn:
+                    return work(conn)
+            except DBAPIError as e:
+                if attempt == max_retries or get_error_code(e) not in retry_codes:
+                    raise
+                time.sleep(base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+
     def get_vector_client(self, table_name='airline_policies', vector_dimension=384, recreate=False):
         """Get or create TiDB Vector Client"""
         if self.vector_client is None or recreate:
@@ -133,6 +160,16 @@ class DatabaseManager:
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
             )
+            """,
+            # Serves flight search: route equality plus departure time range
+            """
+            CREATE INDEX IF NOT EXISTS idx_flights_route_departure
+            ON flights (departure_airport, arrival_airport, departure_time)
+            """,
+            # Serves flight details and booking lookups by flight number
+            """
+            CREATE INDEX IF NOT EXISTS idx_flights_number_departure
+            ON flights (flight_number, departure_time)
             """
         ]
 
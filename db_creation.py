@@ -1,67 +1,174 @@
+import hashlib
 import json
 import os
+import sys
+import time
+import uuid
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
 
 from dotenv import load_dotenv
-from tidb_vector.integrations import TiDBVectorClient
+from sqlalchemy import text
 
+from config.database import db_manager
 from utils.embeddings import embedding_service
 
 load_dotenv()
 
-
-def ingest_airline_policies() -> str:
-    """Ingest airline policies with vector embeddings using TiDBVectorClient"""
+POLICY_TABLE = 'airline_policies'
+POLICY_ID_NAMESPACE = uuid.UUID('6f1c9a52-3e0b-4d6a-9a57-1f2f8c4b7e10')
+
+EMBED_BATCH_SIZE = int(os.getenv('POLICY_EMBED_BATCH_SIZE', 64))
+INSERT_CHUNK_SIZE = int(os.getenv('POLICY_INSERT_CHUNK_SIZE', 500))
+
+
+def _iter_json_array(f, read_size: int = 64 * 1024) -> Iterator[Dict[str, Any]]:
+    """Yield the objects of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(read_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Expected a JSON array of policies")
+    buffer = buffer[1:]
+
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            more = f.read(read_size)
+            if not more:
+                raise
+            buffer += more
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def iter_policies(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream policies from a JSON array or a JSONL file"""
+    with open(path, 'r') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(f)
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def policy_id(policy: Dict[str, Any]) -> str:
+    """Stable row ID derived from category and title"""
+    return str(uuid.uuid5(POLICY_ID_NAMESPACE, f"{policy['category']}/{policy['title']}"))
+
+
+def policy_content_hash(policy: Dict[str, Any]) -> str:
+    """Hash of everything that ends up in a policy row"""
+    return hashlib.sha256(
+        json.dumps([policy['category'], policy['title'], policy['content']]).encode()
+    ).hexdigest()
+
+
+def _load_content_hashes() -> Dict[str, str]:
+    """Content hash of every stored policy row, keyed by ID"""
+    rows = db_manager.execute_query(
+        f"SELECT id, JSON_UNQUOTE(JSON_EXTRACT(meta, '$.content_hash')) AS content_hash FROM {POLICY_TABLE}"
+    )
+    return {row.id: row.content_hash for row in rows}
+
+
+def _upsert_policies(rows: List[Dict[str, Any]]) -> None:
+    """Insert or replace policy rows in place so the live table is never empty"""
+    with db_manager.engine.begin() as conn:
+        conn.execute(text(f"""
+            INSERT INTO {POLICY_TABLE} (id, embedding, document, meta)
+            VALUES (:id, :embedding, :document, :meta)
+            ON DUPLICATE KEY UPDATE embedding = VALUES(embedding), document = VALUES(document), meta = VALUES(meta)
+        """), rows)
+
+
+def _ensure_category_index() -> None:
+    """Expose meta.category as an indexed generated column so category filters avoid a full scan"""
+    with db_manager.engine.begin() as conn:
+        conn.execute(text(f"""
+            ALTER TABLE {POLICY_TABLE} ADD COLUMN IF NOT EXISTS category VARCHAR(64)
+            AS (JSON_UNQUOTE(JSON_EXTRACT(meta, '$.category'))) VIRTUAL
+        """))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{POLICY_TABLE}_category ON {POLICY_TABLE} (category)"))
+
+
+def ingest_airline_policies(path: str = 'data/airline_policies.json',
+                            batch_size: int = EMBED_BATCH_SIZE,
+                            chunk_size: int = INSERT_CHUNK_SIZE,
+                            force: bool = False) -> str:
+    """Incrementally ingest airline policies, re-embedding only new or changed ones"""
     try:
-        with open('data/airline_policies.json', 'r') as f:
-            policies = json.load(f)
-
-        # Prepare data for TiDBVectorClient
-        ids = []
-        texts = []
-        embeddings = []
-        metadatas = []
-
-        for i, policy in enumerate(policies):
-            # Generate embedding for the policy content
-            embedding = embedding_service.embed_text(policy['content'])
-
-            ids.append(str(i + 1))
-            texts.append(policy['content'])
-            embeddings.append(embedding)
-            metadatas.append({
-                'category': policy['category'],
-                'title': policy['title']
-            })
-
-        # Retrieve environment variables
-        host = os.getenv('TIDB_HOST')
-        port = int(os.getenv('TIDB_PORT', 4000))
-        user = os.getenv('TIDB_USER')
-        password = os.getenv('TIDB_PASSWORD')
-        database = os.getenv('TIDB_DATABASE', 'airline_nexus')
-
-        # Generate the connection string
-        connection_string = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}?ssl_verify_cert=true&ssl_verify_identity=true"
-
-        vector_client = TiDBVectorClient(
-            table_name="airline_policies",
-            connection_string=connection_string,
-            vector_dimension=384,
-            drop_existing_table=True  # Drop existing table if recreate is True
-        )
-
-        # Use TiDBVectorClient to insert data
-        vector_client.insert(
-            ids=ids,
-            texts=texts,
-            embeddings=embeddings,
-            metadatas=metadatas
-        )
-
-        return f"Successfully ingested {len(policies)} airline policies with embeddings using TiDBVectorClient"
+        # Creates the vector table on first run; never drops it
+        vector_client = db_manager.get_vector_client(table_name=POLICY_TABLE)
+        _ensure_category_index()
+        stored_hashes = _load_content_hashes()
+        seen_ids = set()
+        pending: List[Dict[str, Any]] = []
+
+        started = time.perf_counter()
+        total = 0
+        embedded = 0
+        for batch in _batched(iter_policies(path), batch_size):
+            total += len(batch)
+            changed = []
+            for policy in batch:
+                row_id = policy_id(policy)
+                content_hash = policy_content_hash(policy)
+                seen_ids.add(row_id)
+                if force or stored_hashes.get(row_id) != content_hash:
+                    changed.append((row_id, content_hash, policy))
+
+            if changed:
+                # One encode call per batch, only for new or edited policies
+                embeddings = embedding_service.embed_texts([policy['content'] for _, _, policy in changed])
+                for (row_id, content_hash, policy), embedding in zip(changed, embeddings):
+                    pending.append({
+                        'id': row_id,
+                        'embedding': json.dumps(embedding),
+                        'document': policy['content'],
+                        'meta': json.dumps({
+                            'category': policy['category'],
+                            'title': policy['title'],
+                            'content_hash': content_hash
+                        })
+                    })
+                embedded += len(changed)
+
+            if len(pending) >= chunk_size:
+                _upsert_policies(pending)
+                pending = []
+
+            elapsed = time.perf_counter() - started
+            print(f"Processed {total} policies, embedded {embedded} ({total / elapsed:.1f} docs/sec)")
+
+        if pending:
+            _upsert_policies(pending)
+
+        # Policies no longer in the source file
+        removed = [row_id for row_id in stored_hashes if row_id not in seen_ids]
+        if removed:
+            vector_client.delete(ids=removed)
+
+        elapsed = time.perf_counter() - started
+        throughput = total / elapsed if elapsed > 0 else 0.0
+        return (f"Successfully ingested {total} airline policies: {embedded} embedded, "
+                f"{total - embedded} unchanged, {len(removed)} removed ({throughput:.1f} docs/sec)")
 
     except Exception as e:
         raise Exception(f"Failed to ingest airline policies: {str(e)}")
 
 
-ingest_airline_policies()
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != '--full']
+    print(ingest_airline_policies(*args[:1], force='--full' in sys.argv[1:]))
@@ -0,0 +1,190 @@
+"""
+Flight tool benchmarks against the configured TiDB database
+
+    python -m mcp_server.benchmarks search [flights] [queries]
+    python -m mcp_server.benchmarks oversell [seats] [threads] [attempts]
+
+Each run seeds a synthetic schedule under its own airline and airport codes and
+deletes it afterwards, so it can be pointed at a database holding real data.
+"""
+
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+
+from config.database import db_manager
+from mcp_server.flight_tools import DEFAULT_SEARCH_LIMIT, flight_tools
+from utils.benchmark import latency_summary, measure, print_report
+
+BENCHMARK_AIRLINE = 'NexusBench'
+# Codes outside IATA's three-letter space, so searches only ever see synthetic rows
+BENCHMARK_AIRPORTS = [f"Q{i:02d}" for i in range(24)]
+SCHEDULE_DAYS = 60
+INSERT_BATCH = 1000
+
+
+def seed_schedule(flights: int, seed: int = 7) -> List[Tuple[str, str, str]]:
+    """Insert ``flights`` synthetic departures spread over every route and day; returns the (departure, arrival, day) keys"""
+    rng = random.Random(seed)
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    rows = []
+    for n in range(flights):
+        departure, arrival = rng.sample(BENCHMARK_AIRPORTS, 2)
+        departure_time = start + timedelta(days=rng.randrange(SCHEDULE_DAYS), minutes=rng.randrange(0, 24 * 60, 5))
+        rows.append({
+            'flight_number': f"QB{n:05d}",
+            'airline': BENCHMARK_AIRLINE,
+            'departure_airport': departure,
+            'arrival_airport': arrival,
+            'departure_time': departure_time,
+            'arrival_time': departure_time + timedelta(minutes=rng.randrange(60, 600, 5)),
+            'price': rng.randrange(79, 900),
+            'available_seats': rng.randrange(0, 200)
+        })
+
+    _insert_flights(rows)
+    return sorted({(r['departure_airport'], r['arrival_airport'], r['departure_time'].date().isoformat()) for r in rows})
+
+
+def _insert_flights(rows: List[Dict[str, Any]]) -> None:
+    def insert(conn: Any) -> None:
+        for i in range(0, len(rows), INSERT_BATCH):
+            conn.execute(text("""
+                INSERT INTO flights (flight_number, airline, departure_airport, arrival_airport, departure_time,
+                                     arrival_time, price, available_seats, aircraft_type, status)
+                VALUES (:flight_number, :airline, :departure_airport, :arrival_airport, :departure_time,
+                        :arrival_time, :price, :available_seats, :aircraft_type, :status)
+            """), [dict(row, aircraft_type='A320', status='SCHEDULED') for row in rows[i:i + INSERT_BATCH]])
+
+    db_manager.run_in_transaction(insert)
+
+
+def drop_schedule() -> None:
+    def delete(conn: Any) -> None:
+        conn.execute(text("""
+            DELETE FROM bookings WHERE flight_id IN (SELECT id FROM flights WHERE airline = :airline)
+        """), {'airline': BENCHMARK_AIRLINE})
+        conn.execute(text("DELETE FROM flights WHERE airline = :airline"), {'airline': BENCHMARK_AIRLINE})
+
+    db_manager.run_in_transaction(delete)
+
+
+def _full_scan(departure: str, arrival: str, day: str) -> None:
+    """The route/day search with the route index ignored, as a table without it would run"""
+    window_start, window_end = flight_tools._departure_window(day)
+    db_manager.execute_query("""
+        SELECT id, flight_number, airline, departure_airport, arrival_airport, departure_time,
+               arrival_time, price, available_seats, aircraft_type, status
+        FROM flights IGNORE INDEX (idx_flights_route_departure)
+        WHERE departure_time >= :window_start AND departure_time < :window_end AND available_seats >= 1
+          AND status <> 'CANCELLED' AND departure_airport = :departure AND arrival_airport = :arrival
+        ORDER BY departure_time, id
+        LIMIT :limit
+    """, {'window_start': window_start, 'window_end': window_end, 'departure': departure,
+          'arrival': arrival, 'limit': DEFAULT_SEARCH_LIMIT + 1})
+
+
+def search_benchmark(flights: int = 50000, queries: int = 500) -> Dict[str, Any]:
+    """Route/day search latency: full scan, indexed query, and search_flights with a warm cache"""
+    drop_schedule()
+    searches = seed_schedule(flights)
+    rng = random.Random(11)
+    report: Dict[str, Any] = {'flights': flights, 'routes': len({s[:2] for s in searches}), 'queries': queries}
+    try:
+        pick = lambda: rng.choice(searches)
+        report['full_scan'] = measure(lambda: _full_scan(*pick()), min(queries, 50), warmup=3)
+        report['indexed_query'] = measure(
+            lambda: flight_tools._query_flights(*pick(), 1, DEFAULT_SEARCH_LIMIT + 1, 0), queries, warmup=10
+        )
+
+        # A small working set of popular searches, each looked up once before timing
+        popular = searches[:50]
+        flight_tools.search_cache.clear()
+        for departure, arrival, day in popular:
+            flight_tools.search_flights_impl(departure, arrival, day)
+        report['cached_search'] = measure(lambda: flight_tools.search_flights_impl(*rng.choice(popular)), queries)
+        report['cache'] = flight_tools.search_cache.stats()
+        return report
+    finally:
+        flight_tools.search_cache.clear()
+        drop_schedule()
+
+
+def oversell_test(seats: int = 50, threads: int = 16, attempts: int = 200) -> Dict[str, Any]:
+    """``attempts`` concurrent single-seat bookings from ``threads`` threads against one flight with ``seats`` seats.
+
+    Passes when exactly ``seats`` bookings succeed, every other attempt is turned away,
+    and the flight's seat count matches its confirmed bookings.
+    """
+    drop_schedule()
+    departure_time = datetime.now().replace(second=0, microsecond=0) + timedelta(days=7)
+    _insert_flights([{
+        'flight_number': 'QB99999',
+        'airline': BENCHMARK_AIRLINE,
+        'departure_airport': BENCHMARK_AIRPORTS[0],
+        'arrival_airport': BENCHMARK_AIRPORTS[1],
+        'departure_time': departure_time,
+        'arrival_time': departure_time + timedelta(hours=3),
+        'price': 199,
+        'available_seats': seats
+    }])
+
+    latencies: List[float] = []
+    outcomes = {'booked': 0, 'sold_out': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def attempt(n: int) -> None:
+        start = time.perf_counter()
+        result = flight_tools.create_booking_impl('QB99999', f"Bench Passenger {n}", f"passenger{n}@example.com")
+        elapsed = time.perf_counter() - start
+        outcome = 'booked' if result['success'] else (
+            'sold_out' if 'Not enough seats' in result.get('error', '') else 'errors')
+        with lock:
+            latencies.append(elapsed)
+            outcomes[outcome] += 1
+
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(attempt, range(attempts)))
+
+        row = db_manager.execute_query("""
+            SELECT f.available_seats,
+                   (SELECT COUNT(*) FROM bookings b WHERE b.flight_id = f.id AND b.booking_status = 'CONFIRMED')
+            FROM flights f WHERE f.flight_number = 'QB99999' AND f.airline = :airline
+        """, {'airline': BENCHMARK_AIRLINE})[0]
+        available, confirmed = int(row[0]), int(row[1])
+        return {
+            'seats': seats,
+            'threads': threads,
+            'attempts': attempts,
+            **outcomes,
+            'confirmed_bookings': confirmed,
+            'available_seats': available,
+            'ok': (confirmed == outcomes['booked'] == min(seats, attempts) and available == seats - confirmed
+                   and available >= 0 and outcomes['errors'] == 0),
+            'booking': latency_summary(latencies)
+        }
+    finally:
+        drop_schedule()
+
+
+BENCHMARKS = {
+    'search': search_benchmark,
+    'oversell': oversell_test,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python -m mcp_server.benchmarks {{{'|'.join(BENCHMARKS)}}} [args...]")
+        sys.exit(1)
+    report = BENCHMARKS[sys.argv[1]](*(int(arg) for arg in sys.argv[2:]))
+    print_report(report)
+    if report.get('ok') is False:
+        sys.exit(1)
@@ -5,12 +5,17 @@ Replaces the FastAPI endpoints with direct MCP tool methods
 
 import logging
 import os
+import secrets
+import string
 import sys
 from datetime import datetime, timedelta
 from typing import Any
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from mcp.server.fastmcp import FastMCP
+from sqlalchemy import text
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -21,40 +26,87 @@ logger = logging.getLogger("flight-mcp-server")
 # Create server instance
 mcp = FastMCP("airlinenexus-flight-server")
 
-from config.database import db_manager
+from config.database import db_manager, RETRYABLE_ERROR_CODES, DUPLICATE_KEY_ERROR_CODE
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+
+# Route/day search results are cached per passenger-count bucket (lower bounds)
+PASSENGER_BUCKETS = (1, 2, 3, 5, 10)
+ROUTE_DAY_MAX_ROWS = 500
+
+MAX_BULK_BOOKINGS = 200
+
+BOOKING_REFERENCE_ALPHABET = string.ascii_uppercase + string.digits
+# Booking transactions also replay on a booking reference collision
+BOOKING_RETRY_CODES = RETRYABLE_ERROR_CODES | {DUPLICATE_KEY_ERROR_CODE}
+
+# Fare multipliers applied to the economy base price stored in flights.price
+CLASS_PRICE_MULTIPLIERS = {
+    'economy': 1,
+    'business': 2.5,
+    'first': 4
+}
+
+
+class SeatsUnavailableError(Exception):
+    """Raised when a flight no longer has enough seats for a booking"""
+
 
 class FlightMCPTools:
     """MCP Tools for flight operations without HTTP API dependency"""
 
     def __init__(self):
         self.db_manager = db_manager
+        self.search_cache = TTLCache(
+            max_entries=int(os.getenv('FLIGHT_SEARCH_CACHE_MAX_ENTRIES', 10000)),
+            ttl=float(os.getenv('FLIGHT_SEARCH_CACHE_TTL', 60)),
+            max_bytes=int(os.getenv('FLIGHT_SEARCH_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        )
 
     def search_flights_impl(self,
                             departure_airport: Optional[str] = None,
                             arrival_airport: Optional[str] = None,
                             departure_date: Optional[str] = None,
                             passengers: int = 1,
-                            class_preference: str = "economy") -> Dict[str, Any]:
+                            class_preference: str = "economy",
+                            limit: int = DEFAULT_SEARCH_LIMIT,
+                            offset: int = 0) -> Dict[str, Any]:
         """Search for available flights based on criteria"""
         try:
-            # Generate mock flight data based on search criteria
-            flights = self._generate_flight_results(
-                departure_airport, arrival_airport, departure_date, passengers, class_preference
-            )
+            limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+            offset = max(0, int(offset))
+
+            cache_key = self._search_cache_key(departure_airport, arrival_airport, departure_date, passengers)
+            if cache_key is not None:
+                # Popular route/day searches are served from the cached day schedule
+                rows = [row for row in self._get_route_day(cache_key) if row['available_seats'] >= passengers]
+                rows = rows[offset:offset + limit + 1]
+            else:
+                # Fetch one extra row to know whether another page exists without a COUNT(*)
+                rows = self._query_flights(
+                    departure_airport, arrival_airport, departure_date, passengers, limit + 1, offset
+                )
+            has_more = len(rows) > limit
+            flights = [self._format_flight(row, passengers, class_preference) for row in rows[:limit]]
 
             return {
                 'success': True,
                 'flights': flights,
                 'total_results': len(flights),
+                'has_more': has_more,
+                'next_offset': offset + limit if has_more else None,
                 'search_criteria': {
                     'departure_airport': departure_airport,
                     'arrival_airport': arrival_airport,
                     'departure_date': departure_date,
                     'passengers': passengers,
-                    'class_preference': class_preference
+                    'class_preference': class_preference,
+                    'limit': limit,
+                    'offset': offset
                 }
             }
 
@@ -66,11 +118,10 @@ class FlightMCPTools:
                 'flights': []
             }
 
-    def get_flight_details_impl(self, flight_number: str) -> Dict[str, Any]:
+    def get_flight_details_impl(self, flight_number: str, departure_date: Optional[str] = None) -> Dict[str, Any]:
         """Get detailed information about a specific flight"""
         try:
-            # Generate flight details based on flight number
-            flight_details = self._generate_flight_details(flight_number)
+            flight_details = self._fetch_flight(flight_number, departure_date)
 
             if flight_details:
                 return {
@@ -95,23 +146,28 @@ class FlightMCPTools:
                             passenger_name: str,
                             passenger_email: str,
                             phone_number: Optional[str] = None,
-                            special_requests: Optional[str] = None) -> Dict[str, Any]:
+                            special_requests: Optional[str] = None,
+                            departure_date: Optional[str] = None) -> Dict[str, Any]:
         """Create a flight booking"""
         try:
-            # Generate booking reference
-            booking_reference = self._generate_booking_reference()
-
             # Get flight details
-            flight_result = self.get_flight_details_impl(flight_number)
+            flight_result = self.get_flight_details_impl(flight_number, departure_date)
             if not flight_result['success']:
                 return flight_result
 
             flight = flight_result['flight']
 
-            # Create booking record
+            # Decrement inventory and insert the booking in one transaction
+            references = self.db_manager.run_in_transaction(
+                lambda conn: self._book_seats(conn, {flight['flight_id']: [(passenger_name, passenger_email)]}),
+                retry_codes=BOOKING_RETRY_CODES
+            )
+            booking_reference = references[flight['flight_id']][0]
+            self._invalidate_flight_searches(flight)
+
             booking = {
                 'booking_reference': booking_reference,
-                'flight_number': flight_number,
+                'flight_number': flight['flight_number'],
                 'passenger_name': passenger_name,
                 'passenger_email': passenger_email,
                 'phone_number': phone_number,
@@ -119,18 +175,20 @@ class FlightMCPTools:
                 'booking_date': datetime.now().isoformat(),
                 'status': 'confirmed',
                 'flight_details': flight,
-                'total_price': flight.get('price', 299)
+                'total_price': flight['price']
             }
 
-            # Store booking (in production, would save to database)
-            self._store_booking(booking)
-
             return {
                 'success': True,
                 'booking': booking,
                 'message': f'Booking confirmed! Reference: {booking_reference}'
             }
 
+        except SeatsUnavailableError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
         except Exception as e:
             logger.error(f"Booking creation error: {e}")
             return {
@@ -138,10 +196,95 @@ class FlightMCPTools:
                 'error': str(e)
             }
 
+    def create_bookings_bulk_impl(self, bookings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Create bookings for a group of passengers in a single transaction"""
+        try:
+            if not bookings:
+                return {
+                    'success': False,
+                    'error': 'No passengers provided'
+                }
+            if len(bookings) > MAX_BULK_BOOKINGS:
+                return {
+                    'success': False,
+                    'error': f'At most {MAX_BULK_BOOKINGS} passengers can be booked at once'
+                }
+
+            # Resolve each distinct flight once and group passengers by flight
+            flights: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+            groups: Dict[int, List[Tuple[str, str]]] = {}
+            for item in bookings:
+                missing = [field for field in ('flight_number', 'passenger_name', 'passenger_email') if not item.get(field)]
+                if missing:
+                    return {
+                        'success': False,
+                        'error': f"Missing {', '.join(missing)} for passenger {item.get('passenger_name', '')}".strip()
+                    }
+
+                key = (item['flight_number'].strip().upper(), item.get('departure_date'))
+                if key not in flights:
+                    flight = self._fetch_flight(*key)
+                    if flight is None:
+                        return {
+                            'success': False,
+                            'error': f'Flight {key[0]} not found'
+                        }
+                    flights[key] = flight
+                groups.setdefault(flights[key]['flight_id'], []).append((item['passenger_name'], item['passenger_email']))
+
+            # Validate inventory up front; the conditional UPDATE still guards against races
+            for flight in flights.values():
+                if flight['available_seats'] < len(groups[flight['flight_id']]):
+                    return {
+                        'success': False,
+                        'error': f"Flight {flight['flight_number']} has only {flight['available_seats']} seats available"
+                    }
+
+            references = self.db_manager.run_in_transaction(
+                lambda conn: self._book_seats(conn, groups),
+                retry_codes=BOOKING_RETRY_CODES
+            )
+            for flight in flights.values():
+                self._invalidate_flight_searches(flight)
+
+            # Hand references back in the order passengers were given
+            remaining = {flight_id: iter(refs) for flight_id, refs in references.items()}
+            confirmed = []
+            for item in bookings:
+                flight = flights[(item['flight_number'].strip().upper(), item.get('departure_date'))]
+                confirmed.append({
+                    'booking_reference': next(remaining[flight['flight_id']]),
+                    'flight_number': flight['flight_number'],
+                    'departure_time': flight['departure_time'],
+                    'passenger_name': item['passenger_name'],
+                    'passenger_email': item['passenger_email'],
+                    'status': 'confirmed',
+                    'total_price': flight['price']
+                })
+
+            return {
+                'success': True,
+                'bookings': confirmed,
+                'total_bookings': len(confirmed),
+                'total_price': round(sum(booking['total_price'] for booking in confirmed), 2),
+                'message': f'{len(confirmed)} bookings confirmed!'
+            }
+
+        except SeatsUnavailableError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        except Exception as e:
+            logger.error(f"Bulk booking error: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
     def get_booking_status_impl(self, booking_reference: str) -> Dict[str, Any]:
         """Get booking status and details"""
         try:
-            # Retrieve booking (in production, would query database)
             booking = self._retrieve_booking(booking_reference)
 
             if booking:
@@ -174,13 +317,20 @@ class FlightMCPTools:
                     'error': f'Booking {booking_reference} not found'
                 }
 
-            # Update booking status
+            # Conditional update makes cancellation idempotent; seats are released only once
+            cancelled = self.db_manager.run_in_transaction(
+                lambda conn: self._cancel_seat(conn, booking['booking_reference'], booking['flight_details']['flight_id'])
+            )
+            if not cancelled:
+                return {
+                    'success': False,
+                    'error': f'Booking {booking_reference} is already cancelled'
+                }
+
+            self._invalidate_flight_searches(booking['flight_details'])
             booking['status'] = 'cancelled'
             booking['cancellation_date'] = datetime.now().isoformat()
 
-            # Store updated booking
-            self._store_booking(booking)
-
             return {
                 'success': True,
                 'booking': booking,
@@ -194,110 +344,206 @@ class FlightMCPTools:
                 'error': str(e)
             }
 
-    def _generate_flight_results(self, departure: str, arrival: str, date: str, passengers: int, class_pref: str) -> \
-            List[Dict[str, Any]]:
-        """Generate mock flight search results"""
-        flights = []
-
-        # Generate 2 flight options
-        for i in range(3, 5):
-            airline = "AirlineNexus"
-            flight_number = "AN" + str(100 + i)
-
-            # Calculate departure and arrival times
-            base_time = datetime.now() + timedelta(days=1)
-            departure_time = base_time.replace(hour=6 + i * 2, minute=0, second=0)
-            arrival_time = departure_time + timedelta(hours=3 + i * 0.5)
-
-            # Price varies by class
-            base_price = 200 + i * 50
-            if class_pref == 'business':
-                base_price *= 2.5
-            elif class_pref == 'first':
-                base_price *= 4
-
-            flight = {
-                'flight_number': flight_number,
-                'airline': "AirlineNexus",
-                'departure_airport': departure or 'JFK',
-                'arrival_airport': arrival or 'LAX',
-                'departure_time': departure_time.isoformat(),
-                'arrival_time': arrival_time.isoformat(),
-                'duration': '5h 30m',
-                'aircraft': 'Boeing 737-800',
-                'price': int(base_price * passengers),
-                'currency': 'USD',
-                'available_seats': 45 - i * 5,
-                'class': class_pref,
-                'stops': 0 if i < 3 else 1,
-                'status': 'available'
-            }
-
-            flights.append(flight)
-
-        return flights
-
-    def _generate_flight_details(self, flight_number: str) -> Optional[Dict[str, Any]]:
-        """Generate detailed flight information"""
-        # Extract airline code from flight number
-        airline_code = flight_number[:2]
-
-        airline_name = "AirlineNexus"
-
-        # Generate departure/arrival times
-        departure_time = datetime.now() + timedelta(days=1, hours=8)
-        arrival_time = departure_time + timedelta(hours=5, minutes=30)
+    def _query_flights(self, departure: Optional[str], arrival: Optional[str], date: Optional[str],
+                       passengers: int, limit: int, offset: int) -> List[Dict[str, Any]]:
+        """Query the flights table; served by idx_flights_route_departure"""
+        window_start, window_end = self._departure_window(date)
+
+        conditions = ["departure_time >= :window_start", "available_seats >= :passengers", "status <> 'CANCELLED'"]
+        params = {
+            'window_start': window_start,
+            'passengers': max(1, int(passengers)),
+            'limit': limit,
+            'offset': offset
+        }
+        if departure:
+            conditions.append("departure_airport = :departure_airport")
+            params['departure_airport'] = departure.strip().upper()
+        if arrival:
+            conditions.append("arrival_airport = :arrival_airport")
+            params['arrival_airport'] = arrival.strip().upper()
+        if window_end is not None:
+            conditions.append("departure_time < :window_end")
+            params['window_end'] = window_end
+
+        query = f"""
+            SELECT id, flight_number, airline, departure_airport, arrival_airport, departure_time,
+                   arrival_time, price, available_seats, aircraft_type, status
+            FROM flights
+            WHERE {' AND '.join(conditions)}
+            ORDER BY departure_time, id
+            LIMIT :limit OFFSET :offset
+        """
+        return [dict(row._mapping) for row in self.db_manager.execute_query(query, params)]
+
+    def _search_cache_key(self, departure: Optional[str], arrival: Optional[str], date: Optional[str],
+                          passengers: int) -> Optional[Tuple[str, str, str, int]]:
+        """Normalized cache key for route/day searches; None when the search is not cacheable.
+
+        Results are fare-class independent (class only scales the price), so the class
+        preference is not part of the key.
+        """
+        if not (departure and arrival and date):
+            return None
+        day = self._departure_window(date)[0].date().isoformat()
+        bucket = max(b for b in PASSENGER_BUCKETS if b <= max(1, int(passengers)))
+        return departure.strip().upper(), arrival.strip().upper(), day, bucket
+
+    def _get_route_day(self, cache_key: Tuple[str, str, str, int]) -> List[Dict[str, Any]]:
+        """Full day schedule for a route with at least the bucket's seat count, cached"""
+        rows = self.search_cache.get(cache_key)
+        if rows is None:
+            departure, arrival, day, min_seats = cache_key
+            # A booking that commits while we read invalidates the route after our query
+            # started; the token makes set() drop the now stale rows instead of caching them
+            token = self.search_cache.token()
+            rows = self._query_flights(departure, arrival, day, min_seats, ROUTE_DAY_MAX_ROWS, 0)
+            self.search_cache.set(cache_key, rows, tags=[self._route_tag(departure, arrival, day)], since=token)
+        return rows
+
+    def _route_tag(self, departure: str, arrival: str, day: str) -> str:
+        return f"route:{departure}:{arrival}:{day}"
+
+    def _invalidate_flight_searches(self, flight: Dict[str, Any]) -> None:
+        """Drop cached searches covering a flight whose seat count changed"""
+        tag = self._route_tag(
+            flight['departure_airport'].upper(), flight['arrival_airport'].upper(), str(flight['departure_time'])[:10]
+        )
+        self.search_cache.invalidate_tag(tag)
+
+    def _departure_window(self, date: Optional[str]) -> Tuple[datetime, Optional[datetime]]:
+        """Whole calendar day for a YYYY-MM-DD date, otherwise everything from now on"""
+        if not date:
+            return datetime.now(), None
+        day = datetime.strptime(date.strip(), "%Y-%m-%d")
+        return day, day + timedelta(days=1)
+
+    def _format_flight(self, row: Any, passengers: int, class_pref: str) -> Dict[str, Any]:
+        """Shape a flights row into a search result"""
+        fare = float(row['price']) * CLASS_PRICE_MULTIPLIERS.get(class_pref, 1)
+        duration_minutes = int((row['arrival_time'] - row['departure_time']).total_seconds() // 60)
 
         return {
-            'flight_number': flight_number,
-            'airline': airline_name,
-            'departure_airport': 'JFK',
-            'departure_city': 'New York',
-            'arrival_airport': 'LAX',
-            'arrival_city': 'Los Angeles',
-            'departure_time': departure_time.isoformat(),
-            'arrival_time': arrival_time.isoformat(),
-            'duration': '5h 30m',
-            'aircraft': 'Boeing 737-800',
-            'terminal_departure': '4',
-            'terminal_arrival': '2',
-            'gate_departure': 'A12',
-            'gate_arrival': 'B8',
-            'status': 'on_time',
-            'price': 299,
+            'flight_id': row['id'],
+            'flight_number': row['flight_number'],
+            'airline': row['airline'],
+            'departure_airport': row['departure_airport'],
+            'arrival_airport': row['arrival_airport'],
+            'departure_time': row['departure_time'].isoformat(),
+            'arrival_time': row['arrival_time'].isoformat(),
+            'duration': f"{duration_minutes // 60}h {duration_minutes % 60}m",
+            'aircraft': row['aircraft_type'],
+            'price': round(fare * passengers, 2),
+            'price_per_passenger': round(fare, 2),
             'currency': 'USD',
-            'available_seats': 42,
-            'class_options': ['economy', 'business', 'first'],
-            'amenities': ['WiFi', 'In-flight Entertainment', 'Meals', 'Power Outlets']
+            'available_seats': row['available_seats'],
+            'class': class_pref,
+            'stops': 0,
+            'status': row['status'].lower()
         }
 
-    def _generate_booking_reference(self) -> str:
-        """Generate a unique booking reference"""
-        import random
-        import string
-        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    def _fetch_flight(self, flight_number: str, departure_date: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Next departure of a flight number (on departure_date, if given)"""
+        window_start, window_end = self._departure_window(departure_date)
+        conditions = ["flight_number = :flight_number", "departure_time >= :window_start"]
+        params = {'flight_number': flight_number.strip().upper(), 'window_start': window_start}
+        if window_end is not None:
+            conditions.append("departure_time < :window_end")
+            params['window_end'] = window_end
+
+        rows = self.db_manager.execute_query(f"""
+            SELECT id, flight_number, airline, departure_airport, arrival_airport, departure_time,
+                   arrival_time, price, available_seats, aircraft_type, status
+            FROM flights
+            WHERE {' AND '.join(conditions)}
+            ORDER BY departure_time
+            LIMIT 1
+        """, params)
+        if not rows:
+            return None
+
+        flight = self._format_flight(dict(rows[0]._mapping), 1, 'economy')
+        flight['class_options'] = list(CLASS_PRICE_MULTIPLIERS)
+        return flight
+
+    def _book_seats(self, conn: Any, groups: Dict[int, List[Tuple[str, str]]]) -> Dict[int, List[str]]:
+        """Reserve seats per flight and insert all bookings at once; must run inside a transaction"""
+        for flight_id, passengers in groups.items():
+            # Conditional decrement: never oversells, no SELECT ... FOR UPDATE needed
+            result = conn.execute(text("""
+                UPDATE flights SET available_seats = available_seats - :seats
+                WHERE id = :flight_id AND available_seats >= :seats AND status <> 'CANCELLED'
+            """), {'flight_id': flight_id, 'seats': len(passengers)})
+            if result.rowcount == 0:
+                raise SeatsUnavailableError(f'Not enough seats available for {len(passengers)} passenger(s)')
+
+        # References rely on the UNIQUE constraint; a collision replays the transaction
+        references = {
+            flight_id: [self._generate_booking_reference() for _ in passengers]
+            for flight_id, passengers in groups.items()
+        }
+        # A single executemany, which PyMySQL rewrites into one multi-row INSERT. It only does
+        # so when VALUES holds nothing but placeholders, so the status is bound, not inlined.
+        conn.execute(text("""
+            INSERT INTO bookings (booking_reference, flight_id, passenger_name, passenger_email, booking_status)
+            VALUES (:booking_reference, :flight_id, :passenger_name, :passenger_email, :booking_status)
+        """), [
+            {
+                'booking_reference': reference,
+                'flight_id': flight_id,
+                'passenger_name': name,
+                'passenger_email': email,
+                'booking_status': 'CONFIRMED'
+            }
+            for flight_id, passengers in groups.items()
+            for reference, (name, email) in zip(references[flight_id], passengers)
+        ])
+        return references
+
+    def _cancel_seat(self, conn: Any, booking_reference: str, flight_id: int) -> bool:
+        """Cancel a confirmed booking and release its seat; must run inside a transaction"""
+        result = conn.execute(text("""
+            UPDATE bookings SET booking_status = 'CANCELLED'
+            WHERE booking_reference = :booking_reference AND booking_status = 'CONFIRMED'
+        """), {'booking_reference': booking_reference})
+        if result.rowcount == 0:
+            return False
+
+        conn.execute(text("UPDATE flights SET available_seats = available_seats + 1 WHERE id = :flight_id"),
+                     {'flight_id': flight_id})
+        return True
 
-    def _store_booking(self, booking: Dict[str, Any]) -> None:
-        """Store booking (mock implementation)"""
-        # In production, this would save to database
-        # For demo, we'll just log it
-        logger.info(f"Stored booking: {booking['booking_reference']}")
+    def _generate_booking_reference(self) -> str:
+        """Generate a random booking reference"""
+        return ''.join(secrets.choice(BOOKING_REFERENCE_ALPHABET) for _ in range(6))
 
     def _retrieve_booking(self, booking_reference: str) -> Optional[Dict[str, Any]]:
-        """Retrieve booking (mock implementation)"""
-        # Mock booking data for demo
-        if booking_reference in ['ABC123', 'XYZ789']:
-            return {
-                'booking_reference': booking_reference,
-                'flight_number': 'AN101',
-                'passenger_name': 'John Doe',
-                'passenger_email': 'john.doe@email.com',
-                'booking_date': datetime.now().isoformat(),
-                'status': 'confirmed',
-                'total_price': 299,
-                'flight_details': self._generate_flight_details('AN101')
-            }
-        return None
+        """Retrieve a booking together with its flight"""
+        rows = self.db_manager.execute_query("""
+            SELECT b.booking_reference, b.passenger_name, b.passenger_email, b.seat_number,
+                   b.booking_status, b.booking_time,
+                   f.id, f.flight_number, f.airline, f.departure_airport, f.arrival_airport, f.departure_time,
+                   f.arrival_time, f.price, f.available_seats, f.aircraft_type, f.status
+            FROM bookings b
+            JOIN flights f ON f.id = b.flight_id
+            WHERE b.booking_reference = :booking_reference
+        """, {'booking_reference': booking_reference.strip().upper()})
+        if not rows:
+            return None
+
+        row = dict(rows[0]._mapping)
+        flight = self._format_flight(row, 1, 'economy')
+        return {
+            'booking_reference': row['booking_reference'],
+            'flight_number': row['flight_number'],
+            'passenger_name': row['passenger_name'],
+            'passenger_email': row['passenger_email'],
+            'seat_number': row['seat_number'],
+            'booking_date': row['booking_time'].isoformat() if row['booking_time'] else None,
+            'status': row['booking_status'].lower(),
+            'total_price': flight['price'],
+            'flight_details': flight
+        }
 
 
 # Initialize the flight tools instance
@@ -310,7 +556,9 @@ def search_flights(departure_airport: Optional[str] = None,
                    arrival_airport: Optional[str] = None,
                    departure_date: Optional[str] = None,
                    passengers: int = 1,
-                   class_preference: str = "economy") -> Dict[str, Any]:
+                   class_preference: str = "economy",
+                   limit: int = DEFAULT_SEARCH_LIMIT,
+                   offset: int = 0) -> Dict[str, Any]:
     """
     Search for available flights based on criteria
     
@@ -320,27 +568,30 @@ def search_flights(departure_airport: Optional[str] = None,
         departure_date: Date in YYYY-MM-DD format
         passengers: Number of passengers
         class_preference: 'economy', 'business', or 'first'
+        limit: Maximum number of flights to return (at most 50)
+        offset: Number of flights to skip; use next_offset from a previous page
         
     Returns:
         Dict with flight search results
     """
     return flight_tools.search_flights_impl(
-        departure_airport, arrival_airport, departure_date, passengers, class_preference
+        departure_airport, arrival_airport, departure_date, passengers, class_preference, limit, offset
     )
 
 
 @mcp.tool()
-def get_flight_details(flight_number: str) -> Dict[str, Any]:
+def get_flight_details(flight_number: str, departure_date: Optional[str] = None) -> Dict[str, Any]:
     """
     Get detailed information about a specific flight
     
     Args:
         flight_number: Flight number (e.g., 'AN101')
+        departure_date: Date in YYYY-MM-DD format; defaults to the next departure
         
     Returns:
         Dict with flight details
     """
-    return flight_tools.get_flight_details_impl(flight_number)
+    return flight_tools.get_flight_details_impl(flight_number, departure_date)
 
 
 @mcp.tool()
@@ -348,7 +599,8 @@ def create_booking(flight_number: str,
                    passenger_name: str,
                    passenger_email: str,
                    phone_number: Optional[str] = None,
-                   special_requests: Optional[str] = None) -> Dict[str, Any]:
+                   special_requests: Optional[str] = None,
+                   departure_date: Optional[str] = None) -> Dict[str, Any]:
     """
     Create a flight booking
     
@@ -358,15 +610,32 @@ def create_booking(flight_number: str,
         passenger_email: Passenger email
         phone_number: Contact phone number
         special_requests: Any special requests
+        departure_date: Date in YYYY-MM-DD format; defaults to the next departure
         
     Returns:
         Dict with booking confirmation
     """
     return flight_tools.create_booking_impl(
-        flight_number, passenger_name, passenger_email, phone_number, special_requests
+        flight_number, passenger_name, passenger_email, phone_number, special_requests, departure_date
     )
 
 
+@mcp.tool()
+def create_bookings_bulk(bookings: List[Dict[str, str]]) -> Dict[str, Any]:
+    """
+    Create bookings for a group of passengers in a single transaction.
+    Use this instead of repeated create_booking calls when booking 2 or more passengers.
+    
+    Args:
+        bookings: One entry per passenger with flight_number, passenger_name,
+            passenger_email and optional departure_date (YYYY-MM-DD)
+        
+    Returns:
+        Dict with a booking reference per passenger
+    """
+    return flight_tools.create_bookings_bulk_impl(bookings)
+
+
 @mcp.tool()
 def get_booking_status(booking_reference: str) -> Dict[str, Any]:
     """
@@ -395,6 +664,12 @@ def cancel_booking(booking_reference: str) -> Dict[str, Any]:
     return flight_tools.cancel_booking_impl(booking_reference)
 
 
+@mcp.custom_route("/cache/stats", methods=["GET"])
+async def search_cache_stats(request: Request) -> JSONResponse:
+    """Expose flight search cache counters for capacity planning"""
+    return JSONResponse(flight_tools.search_cache.stats())
+
+
 # Global instance
 if __name__ == "__main__":
     mcp.run(transport="streamable-http")
@@ -0,0 +1,112 @@
+import copy
+import hashlib
+import json
+import os
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from dotenv import load_dotenv
+from strands.models import Model
+
+from utils.cache import TTLCache
+
+load_dotenv()
+
+_NO_USAGE = {'inputTokens': 0, 'outputTokens': 0, 'totalTokens': 0}
+
+
+class CachingModel(Model):
+    """Model wrapper that keeps request prefixes stable and caches deterministic responses.
+
+    Tool specs are sent sorted by name, so an agent's system prompt and tool block form
+    the same prefix on every call and the provider's context cache can reuse it. Calls
+    made at temperature 0 are also cached locally for ``ttl`` seconds, keyed on the
+    model id, params, system prompt, tools and full message list; a hit replays the
+    recorded stream events without a request, reporting zero token usage.
+    """
+
+    def __init__(self,
+                 model: Model,
+                 cache_responses: bool = os.getenv('MODEL_RESPONSE_CACHE', 'true').lower() == 'true',
+                 ttl: float = float(os.getenv('MODEL_RESPONSE_CACHE_TTL', 600)),
+                 max_entries: int = int(os.getenv('MODEL_RESPONSE_CACHE_MAX_ENTRIES', 1024)),
+                 max_bytes: int = int(float(os.getenv('MODEL_RESPONSE_CACHE_MAX_MB', 64)) * 1024 * 1024)):
+        self.model = model
+        self.cache_responses = cache_responses
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes)
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        # strands reads config['model_id'] for telemetry
+        return self.model.config
+
+    @property
+    def stateful(self) -> bool:
+        return self.model.stateful
+
+    def update_config(self, **model_config: Any) -> None:
+        self.model.update_config(**model_config)
+
+    def get_config(self) -> Any:
+        return self.model.get_config()
+
+    def structured_output(self, output_model: Any, prompt: Any, system_prompt: Optional[str] = None, **kwargs: Any):
+        return self.model.structured_output(output_model, prompt, system_prompt=system_prompt, **kwargs)
+
+    async def count_tokens(self, *args: Any, **kwargs: Any) -> int:
+        return await self.model.count_tokens(*args, **kwargs)
+
+    async def stream(self,
+                     messages: List[Dict[str, Any]],
+                     tool_specs: Optional[List[Dict[str, Any]]] = None,
+                     system_prompt: Optional[str] = None,
+                     **kwargs: Any) -> AsyncGenerator[Dict[str, Any], None]:
+        if tool_specs:
+            tool_specs = sorted(tool_specs, key=lambda spec: spec['name'])
+
+        key = self._cache_key(messages, tool_specs, system_prompt, kwargs)
+        if key is None:
+            async for event in self.model.stream(messages, tool_specs, system_prompt, **kwargs):
+                yield event
+            return
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            for event in cached:
+                event = copy.deepcopy(event)
+                if 'metadata' in event:
+                    event['metadata']['usage'] = dict(_NO_USAGE)
+                yield event
+            return
+
+        events = []
+        async for event in self.model.stream(messages, tool_specs, system_prompt, **kwargs):
+            events.append(copy.deepcopy(event))
+            yield event
+        # Only reached when the stream completed; failed or abandoned calls are never stored
+        self.cache.set(key, events)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+    def _cache_key(self,
+                   messages: List[Dict[str, Any]],
+                   tool_specs: Optional[List[Dict[str, Any]]],
+                   system_prompt: Optional[str],
+                   kwargs: Dict[str, Any]) -> Optional[str]:
+        """Hash of everything that determines the response; None unless sampling is deterministic"""
+        if not self.cache_responses:
+            return None
+        config = self.model.get_config()
+        params = config.get('params') or {}
+        if params.get('temperature') != 0:
+            return None
+        payload = json.dumps({
+            'model_id': config.get('model_id'),
+            'params': params,
+            'system_prompt': system_prompt,
+            'system_prompt_content': kwargs.get('system_prompt_content'),
+            'tool_specs': tool_specs,
+            'tool_choice': kwargs.get('tool_choice'),
+            'messages': messages
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
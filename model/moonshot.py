@@ -1,21 +1,89 @@
 import os
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional
 
+import httpx
+import openai
 from dotenv import load_dotenv
 from strands.models.openai import OpenAIModel
 
+from model.caching import CachingModel
+from model.resilience import ResilientModel
+from utils.event_loop import agent_loop
+
 load_dotenv()
 
+MOONSHOT_BASE_URL = os.getenv('MOONSHOT_BASE_URL', "https://api.moonshot.ai/v1")
+MOONSHOT_MODEL = os.getenv('MOONSHOT_MODEL', "kimi-k2-0711-preview")
+
+
+class PooledOpenAIModel(OpenAIModel):
+    """OpenAIModel that reuses one keep-alive HTTP client for calls made on ``agent_loop``.
+
+    httpx connections cannot be shared between event loops, so calls from any other
+    loop (e.g. a plain ``agent(prompt)``, which runs on a fresh loop) keep the default
+    behaviour of a short-lived client per request.
+    """
+
+    def __init__(self, client_args, **model_config):
+        super().__init__(client_args=client_args, **model_config)
+        self._pooled_client = None
+
+    @asynccontextmanager
+    async def _get_client(self):
+        if not agent_loop.is_current():
+            async with super()._get_client() as client:
+                yield client
+            return
 
-def get_model():
-    return OpenAIModel(
+        # Only ever touched from the agent loop thread, so no lock is needed
+        if self._pooled_client is None:
+            self._pooled_client = openai.AsyncOpenAI(
+                **self.client_args,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=int(os.getenv('MOONSHOT_MAX_CONNECTIONS', 50)),
+                        max_keepalive_connections=int(os.getenv('MOONSHOT_MAX_KEEPALIVE', 20)),
+                        keepalive_expiry=float(os.getenv('MOONSHOT_KEEPALIVE_EXPIRY', 60))
+                    ),
+                    timeout=httpx.Timeout(float(os.getenv('MOONSHOT_TIMEOUT', 120)), connect=10.0)
+                )
+            )
+        yield self._pooled_client
+
+
+def _moonshot_model(model_id: str, base_url: str, api_key: Optional[str], temperature: float) -> PooledOpenAIModel:
+    return PooledOpenAIModel(
         client_args={
-            "api_key": os.getenv('MOONSHOT_API_KEY'),
-            "base_url": "https://api.moonshot.ai/v1"
+            "api_key": api_key,
+            "base_url": base_url,
+            # Retries, timeouts and failover are handled by ResilientModel
+            "max_retries": 0
         },
         # **model_config
-        model_id="kimi-k2-0711-preview",
+        model_id=model_id,
         params={
             "max_tokens": 1000,
-            "temperature": 0.7,
+            "temperature": temperature,
         }
     )
+
+
+@lru_cache(maxsize=None)
+def get_model(temperature: float = 0.7):
+    """Process-wide Moonshot model per temperature; it holds no per-conversation state, so agents share it"""
+    api_key = os.getenv('MOONSHOT_API_KEY')
+    primary = _moonshot_model(MOONSHOT_MODEL, MOONSHOT_BASE_URL, api_key, temperature)
+
+    fallback = None
+    fallback_model = os.getenv('MOONSHOT_FALLBACK_MODEL')
+    fallback_url = os.getenv('MOONSHOT_FALLBACK_BASE_URL')
+    if fallback_model or fallback_url:
+        fallback = _moonshot_model(
+            fallback_model or MOONSHOT_MODEL,
+            fallback_url or MOONSHOT_BASE_URL,
+            os.getenv('MOONSHOT_FALLBACK_API_KEY', api_key),
+            temperature
+        )
+    return CachingModel(ResilientModel(primary, fallback))
@@ -0,0 +1,316 @@
+import hashlib
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from strands import Agent
+from strands.models.openai import OpenAIModel
+
+from model.caching import CachingModel
+from model.moonshot import PooledOpenAIModel
+from model.resilience import ResilientModel
+from multi_agents.agent_factory import AgentPool
+from utils.benchmark import measure
+from utils.event_loop import agent_loop
+from utils.prompts import prompt_manager
+
+DEFAULT_QUERIES_PATH = "data/routing_examples.json"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible chat completions endpoint that streams a canned answer"""
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.record(request)
+
+        # Injected faults: some requests fail outright, some stall before answering
+        if random.random() < self.server.error_rate:
+            self._send(503, 'application/json', json.dumps({'error': {'message': "Injected failure", 'type': 'server_error'}}))
+            return
+        if random.random() < self.server.slow_rate:
+            time.sleep(self.server.slow_delay)
+
+        question = request['messages'][-1].get('content', '')
+        if isinstance(question, list):
+            question = " ".join(part.get('text', '') for part in question)
+        chunks = [
+            {'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': f"Stub answer to: {question[:80]}"}}]},
+            {'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]},
+            {'choices': [], 'usage': {'prompt_tokens': len(json.dumps(request)) // 4, 'completion_tokens': 20,
+                                      'total_tokens': len(json.dumps(request)) // 4 + 20}},
+        ]
+        body = "".join(
+            f"data: {json.dumps({'id': 'stub', 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': request['model'], **chunk})}\n\n"
+            for chunk in chunks
+        ) + "data: [DONE]\n\n"
+
+        self._send(200, 'text/event-stream', body)
+
+    def _send(self, status: int, content_type: str, body: str) -> None:
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body.encode())))
+            self.end_headers()
+            self.wfile.write(body.encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up, e.g. a hedged request that lost the race
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """Local stand-in for the Moonshot API that counts requests and distinct prompt prefixes.
+
+    ``error_rate`` of requests get a 503 and ``slow_rate`` stall for ``slow_delay`` seconds.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, error_rate: float = 0.0, slow_rate: float = 0.0, slow_delay: float = 0.0):
+        super().__init__(('127.0.0.1', 0), _StubHandler)
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.requests = 0
+        self.prefixes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def record(self, request: Dict[str, Any]) -> None:
+        # The cacheable prefix: system message and tool definitions, ahead of the conversation
+        system = [m for m in request['messages'] if m.get('role') == 'system']
+        prefix = hashlib.sha256(json.dumps([system, request.get('tools')], sort_keys=True).encode()).hexdigest()
+        with self._lock:
+            self.requests += 1
+            self.prefixes[prefix] += 1
+
+
+def load_queries(path: str) -> List[str]:
+    with open(path) as f:
+        data = json.load(f)
+    return [item['query'] if isinstance(item, dict) else item for item in data]
+
+
+def _stub_model(server: StubServer, temperature: float = 0.7) -> PooledOpenAIModel:
+    return PooledOpenAIModel(
+        client_args={"api_key": "stub", "base_url": server.base_url, "max_retries": 0},
+        model_id="kimi-k2-0711-preview",
+        params={"max_tokens": 1000, "temperature": temperature}
+    )
+
+
+def replay(queries: List[str], passes: int = 2) -> Dict[str, Any]:
+    """Run the query set ``passes`` times through a cached temperature-0 coordinator model against the stub"""
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, name="model-stub", daemon=True).start()
+    try:
+        model = CachingModel(_stub_model(server, temperature=0), cache_responses=True)
+        agent = Agent(model=model, system_prompt=prompt_manager.system_prompt('coordinator'), callback_handler=None)
+
+        report: Dict[str, Any] = {'queries': len(queries), 'passes': passes}
+        for n in range(1, passes + 1):
+            before = model.stats()
+            for query in queries:
+                agent.messages = []
+                agent_loop.run(agent.invoke_async(query))
+            after = model.stats()
+            hits = after['hits'] - before['hits']
+            lookups = hits + after['misses'] - before['misses']
+            report[f'pass_{n}_hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+
+        report['model_requests'] = server.requests
+        report['distinct_prompt_prefixes'] = len(server.prefixes)
+        report['cache'] = model.stats()
+        return report
+    finally:
+        server.shutdown()
+
+
+def _latency_report(latencies: List[float], errors: int) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    percentile = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3) if ordered else None
+    return {'ok': len(latencies), 'errors': errors, 'p50': percentile(0.50), 'p95': percentile(0.95),
+            'p99': percentile(0.99), 'mean': round(statistics.mean(ordered), 3) if ordered else None}
+
+
+def fault_test(queries: List[str], error_rate: float = 0.1, slow_rate: float = 0.1,
+               slow_delay: float = 20.0) -> Dict[str, Any]:
+    """Latency and error rate with and without ResilientModel against a primary stub that injects faults.
+
+    The resilient run hedges to a healthy second stub, standing in for the fallback endpoint.
+    """
+    primary, fallback = StubServer(error_rate, slow_rate, slow_delay), StubServer()
+    for server in (primary, fallback):
+        threading.Thread(target=server.serve_forever, name="model-stub", daemon=True).start()
+    models = {
+        'baseline': _stub_model(primary),
+        'resilient': ResilientModel(_stub_model(primary), _stub_model(fallback), deadline=30,
+                                    first_event_timeout=10, hedge_delay=1.0, backoff_base=0.1)
+    }
+    report: Dict[str, Any] = {'queries': len(queries), 'error_rate': error_rate, 'slow_rate': slow_rate,
+                              'slow_delay': slow_delay}
+    try:
+        for name, model in models.items():
+            # strands' own throttling retries are off so both runs measure the model client alone
+            agent = Agent(model=model, system_prompt=prompt_manager.system_prompt('coordinator'),
+                          callback_handler=None, retry_strategy=None)
+            latencies, errors = [], 0
+            for query in queries:
+                agent.messages = []
+                start = time.monotonic()
+                try:
+                    agent_loop.run(agent.invoke_async(query))
+                    latencies.append(time.monotonic() - start)
+                except Exception:
+                    errors += 1
+            report[name] = _latency_report(latencies, errors)
+        report['resilient_stats'] = models['resilient'].stats()
+        return report
+    finally:
+        primary.shutdown()
+        fallback.shutdown()
+
+
+def overhead(calls: int = 200) -> Dict[str, Any]:
+    """Per-call cost outside the model, against a stub that answers immediately.
+
+    Compares building a new Agent and OpenAI client for every call, as the specialists
+    originally did, with leasing a pooled agent that shares one keep-alive client.
+    """
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, name="model-stub", daemon=True).start()
+    system_prompt = prompt_manager.system_prompt('policy')
+    question = "How many carry-on bags can I bring?"
+
+    def build() -> Agent:
+        model = OpenAIModel(client_args={"api_key": "stub", "base_url": server.base_url, "max_retries": 0},
+                            model_id="kimi-k2-0711-preview", params={"max_tokens": 1000, "temperature": 0.7})
+        return Agent(model=model, system_prompt=system_prompt, callback_handler=None)
+
+    shared = _stub_model(server)
+    pool = AgentPool(lambda: Agent(model=shared, system_prompt=system_prompt, callback_handler=None))
+
+    def lease() -> None:
+        with pool.lease():
+            pass
+
+    def pooled_call() -> None:
+        with pool.lease() as agent:
+            agent_loop.run(agent.invoke_async(question))
+
+    try:
+        return {
+            'calls': calls,
+            'build_agent': measure(build, calls, warmup=5),
+            'lease_agent': measure(lease, calls, warmup=5),
+            'rebuilt_call': measure(lambda: agent_loop.run(build().invoke_async(question)), calls, warmup=5),
+            'pooled_call': measure(pooled_call, calls, warmup=5),
+            'agents_built_by_pool': pool.created
+        }
+    finally:
+        server.shutdown()
+
+
+def session_load_test(sessions: int = 32, turns: int = 3, model_delay: float = 0.5,
+                      max_workers: int = 8, max_queue: int = 32) -> Dict[str, Any]:
+    """``sessions`` concurrent chat sessions, each sending ``turns`` messages in a row, through
+    the Streamlit front end's job runner, with every model call answered by the stub after
+    ``model_delay`` seconds. Routing is off, so each turn is one coordinator model call.
+    """
+    import os
+
+    server = StubServer(slow_rate=1.0, slow_delay=model_delay)
+    threading.Thread(target=server.serve_forever, name="model-stub", daemon=True).start()
+    # Point the process-wide model at the stub before any agent is built
+    import model.moonshot as moonshot
+    moonshot.MOONSHOT_BASE_URL = server.base_url
+    os.environ['MOONSHOT_API_KEY'] = 'stub'
+    os.environ.pop('MOONSHOT_FALLBACK_MODEL', None)
+    os.environ['EMBEDDING_WARMUP'] = 'false'
+    moonshot.get_model.cache_clear()
+
+    import airline_nexus
+    from utils.jobs import JobQueueFullError, JobRunner
+    from utils.sessions import session_manager
+
+    airline_nexus.ROUTER_ENABLED = False
+    # Every turn must reach the stub; identical first turns would otherwise replay from the response cache
+    moonshot.get_model(temperature=airline_nexus.COORDINATOR_TEMPERATURE).cache_responses = False
+    runner = JobRunner(airline_nexus.handle_session_query, max_workers=max_workers, max_queue=max_queue)
+    queries = load_queries(DEFAULT_QUERIES_PATH)
+    latencies: List[float] = []
+    counts = Counter()
+    lock = threading.Lock()
+
+    def chat(n: int) -> None:
+        session = session_manager.create()
+        for turn in range(turns):
+            start = time.monotonic()
+            try:
+                job = runner.submit(queries[(n * turns + turn) % len(queries)], session=session)
+            except JobQueueFullError:
+                with lock:
+                    counts['rejected'] += 1
+                continue
+            outcome = next(event['type'] for event in job if event['type'] in ('done', 'error'))
+            with lock:
+                counts[outcome] += 1
+                latencies.append(time.monotonic() - start)
+        session_manager.delete(session.id)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=chat, args=(n,)) for n in range(sessions)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        return {
+            'sessions': sessions,
+            'turns': turns,
+            'model_delay': model_delay,
+            'workers': max_workers,
+            'completed': counts['done'],
+            'errors': counts['error'],
+            'rejected': counts['rejected'],
+            'turns_per_s': round((counts['done'] + counts['error']) / elapsed, 2),
+            'turn_latency': _latency_report(latencies, counts['error']),
+            'model_requests': server.requests
+        }
+    finally:
+        runner.shutdown()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    # Usage: python -m model.replay [queries.json] [passes]
+    #        python -m model.replay --faults [queries.json]
+    #        python -m model.replay --overhead [calls]
+    #        python -m model.replay --sessions [sessions] [turns]
+    # Queries are a JSON list of strings or of {"query": ...} objects, e.g. recorded traffic.
+    args = sys.argv[1:]
+    mode = next((arg for arg in args if arg in ('--faults', '--overhead', '--sessions')), None)
+    args = [arg for arg in args if arg != mode]
+    if mode == '--overhead':
+        report = overhead(int(args[0]) if args else 200)
+    elif mode == '--sessions':
+        report = session_load_test(*(int(arg) for arg in args[:2]))
+    elif mode == '--faults':
+        report = fault_test(load_queries(args[0] if args else DEFAULT_QUERIES_PATH))
+    else:
+        report = replay(load_queries(args[0] if args else DEFAULT_QUERIES_PATH), int(args[1]) if len(args) > 1 else 2)
+    for key, value in report.items():
+        print(f"{key}: {value}")
@@ -0,0 +1,296 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Dict, List, Optional, Set, Tuple
+
+import openai
+from dotenv import load_dotenv
+from strands.models import Model
+from strands.types.exceptions import ModelThrottledException
+
+load_dotenv()
+
+
+class ModelTimeoutError(Exception):
+    """Raised when the model does not answer within the call deadline"""
+
+
+class ModelUnavailableError(Exception):
+    """Raised when every endpoint is failing or retries are exhausted"""
+
+
+# Worth another attempt; anything else (bad request, context overflow) fails straight away.
+# ModelThrottledException is not re-raised once retries run out, so strands' own multi-minute
+# throttling backoff never stacks on top of ours.
+TRANSIENT_ERRORS = (
+    ModelTimeoutError,
+    ModelThrottledException,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    openai.RateLimitError,
+)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and lets one trial call through every ``reset_timeout`` seconds"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # A trial that is abandoned (e.g. a cancelled hedge) just waits for the next window
+                self.state = 'half_open'
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.trips += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class _Endpoint:
+    def __init__(self, name: str, model: Model, breaker: CircuitBreaker, min_samples: int = 20):
+        self.name = name
+        self.model = model
+        self.breaker = breaker
+        self.min_samples = min_samples
+        # Seconds to the first streamed event of recent successful calls
+        self.latencies: deque = deque(maxlen=200)
+
+    def p95(self) -> Optional[float]:
+        samples = sorted(self.latencies)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[int(0.95 * (len(samples) - 1))]
+
+
+class ResilientModel(Model):
+    """Model gateway with call deadlines, retries, hedging and circuit breakers.
+
+    Every call must produce its first event within ``first_event_timeout`` and finish
+    within ``deadline`` seconds. Transient failures before the first event are retried
+    with full-jitter exponential backoff, preferring an endpoint other than the one that
+    just failed; once output has streamed a failure is final, since it cannot be taken
+    back. With a ``fallback`` model, a call still waiting for its first event after the
+    primary's p95 time to first event (``hedge_delay`` until enough samples) is also sent
+    to the fallback, and whichever answers first wins. Each endpoint has a circuit
+    breaker, so a failing upstream is skipped instead of stalling every turn.
+    """
+
+    def __init__(self,
+                 primary: Model,
+                 fallback: Optional[Model] = None,
+                 deadline: float = float(os.getenv('MODEL_CALL_DEADLINE', 90)),
+                 first_event_timeout: float = float(os.getenv('MODEL_FIRST_EVENT_TIMEOUT', 30)),
+                 max_retries: int = int(os.getenv('MODEL_MAX_RETRIES', 2)),
+                 backoff_base: float = float(os.getenv('MODEL_RETRY_BACKOFF', 0.5)),
+                 backoff_max: float = 8.0,
+                 hedge: bool = os.getenv('MODEL_HEDGE', 'true').lower() == 'true',
+                 hedge_delay: float = float(os.getenv('MODEL_HEDGE_DELAY', 10)),
+                 breaker_failures: int = int(os.getenv('MODEL_BREAKER_FAILURES', 5)),
+                 breaker_reset: float = float(os.getenv('MODEL_BREAKER_RESET', 30))):
+        self.deadline = deadline
+        self.first_event_timeout = first_event_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge and fallback is not None
+        self.hedge_delay = hedge_delay
+        self.endpoints = [_Endpoint('primary', primary, CircuitBreaker(breaker_failures, breaker_reset))]
+        if fallback is not None:
+            self.endpoints.append(_Endpoint('fallback', fallback, CircuitBreaker(breaker_failures, breaker_reset)))
+        self._lock = threading.Lock()
+        self.counters = {'calls': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0, 'fallbacks': 0,
+                         'timeouts': 0, 'rejected': 0, 'failures': 0}
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.endpoints[0].model.config
+
+    def update_config(self, **model_config: Any) -> None:
+        for endpoint in self.endpoints:
+            endpoint.model.update_config(**model_config)
+
+    def get_config(self) -> Any:
+        return self.endpoints[0].model.get_config()
+
+    def structured_output(self, output_model: Any, prompt: Any, system_prompt: Optional[str] = None, **kwargs: Any):
+        return self.endpoints[0].model.structured_output(output_model, prompt, system_prompt=system_prompt, **kwargs)
+
+    async def count_tokens(self, *args: Any, **kwargs: Any) -> int:
+        return await self.endpoints[0].model.count_tokens(*args, **kwargs)
+
+    async def stream(self,
+                     messages: List[Dict[str, Any]],
+                     tool_specs: Optional[List[Dict[str, Any]]] = None,
+                     system_prompt: Optional[str] = None,
+                     **kwargs: Any) -> AsyncGenerator[Dict[str, Any], None]:
+        self._count('calls')
+        deadline = time.monotonic() + self.deadline
+        request = (messages, tool_specs, system_prompt, kwargs)
+        winner, task, queue, first = await self._first_event(request, deadline)
+        try:
+            if first is None:
+                return
+            yield first
+            while True:
+                try:
+                    endpoint, kind, value = await asyncio.wait_for(queue.get(), max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    self._count('timeouts')
+                    winner.breaker.record_failure()
+                    raise ModelTimeoutError(f"Model response exceeded the {self.deadline:.1f}s call deadline")
+                if endpoint is not winner:
+                    continue  # left over from a cancelled hedge
+                if kind == 'end':
+                    return
+                if kind == 'error':
+                    if isinstance(value, TRANSIENT_ERRORS):
+                        winner.breaker.record_failure()
+                    raise value
+                yield value
+        finally:
+            # Stops the upstream request if the caller gave up early
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+        stats['endpoints'] = {
+            endpoint.name: {
+                'state': endpoint.breaker.state,
+                'trips': endpoint.breaker.trips,
+                'p95_first_event': endpoint.p95()
+            }
+            for endpoint in self.endpoints
+        }
+        return stats
+
+    async def _first_event(self, request: Tuple, deadline: float):
+        failed: Set[_Endpoint] = set()
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._race(request, deadline, failed)
+            except TRANSIENT_ERRORS as e:
+                last_error = e
+            if attempt == self.max_retries:
+                break
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                break
+            self._count('retries')
+            await asyncio.sleep(delay)
+        self._count('failures')
+        raise ModelUnavailableError(f"Model call failed after retries: {last_error}") from last_error
+
+    async def _race(self, request: Tuple, deadline: float, failed: Set[_Endpoint]):
+        """Start the call, hedge it if slow, and return the first endpoint to stream an event"""
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks: Dict[_Endpoint, asyncio.Task] = {}
+        started: Dict[_Endpoint, float] = {}
+
+        def launch(endpoint: _Endpoint) -> None:
+            started[endpoint] = time.monotonic()
+            tasks[endpoint] = asyncio.ensure_future(self._pump(endpoint, request, queue))
+
+        primary = self._pick(failed)
+        if primary is None:
+            self._count('rejected')
+            raise ModelUnavailableError("Every model endpoint is failing; try again shortly")
+        if primary is not self.endpoints[0]:
+            self._count('fallbacks')
+        launch(primary)
+
+        hedge_at = None
+        if self.hedge and len(self.endpoints) > 1:
+            hedge_at = started[primary] + (primary.p95() or self.hedge_delay)
+        first_deadline = min(deadline, started[primary] + self.first_event_timeout)
+        winner = None
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= first_deadline:
+                    self._count('timeouts')
+                    for endpoint in tasks:
+                        endpoint.breaker.record_failure()
+                    failed.update(tasks)
+                    raise ModelTimeoutError(f"No response from the model within {first_deadline - started[primary]:.1f}s")
+                wait_until = first_deadline if hedge_at is None else min(first_deadline, hedge_at)
+                try:
+                    endpoint, kind, value = await asyncio.wait_for(queue.get(), wait_until - now)
+                except asyncio.TimeoutError:
+                    if hedge_at is not None and time.monotonic() >= hedge_at:
+                        hedge_at = None
+                        backup = self._pick(failed | set(tasks), strict=True)
+                        if backup is not None:
+                            self._count('hedges')
+                            launch(backup)
+                    continue
+
+                if kind == 'error':
+                    tasks.pop(endpoint)
+                    if not isinstance(value, TRANSIENT_ERRORS):
+                        raise value
+                    endpoint.breaker.record_failure()
+                    failed.add(endpoint)
+                    if tasks:
+                        continue  # the hedge may still answer
+                    raise value
+
+                endpoint.breaker.record_success()
+                endpoint.latencies.append(time.monotonic() - started[endpoint])
+                if endpoint is not primary:
+                    self._count('hedge_wins')
+                winner = endpoint
+                return endpoint, tasks[endpoint], queue, value if kind == 'event' else None
+        finally:
+            for endpoint, task in tasks.items():
+                if endpoint is not winner:
+                    task.cancel()
+
+    def _pick(self, avoid: Set[_Endpoint], strict: bool = False) -> Optional[_Endpoint]:
+        """First endpoint whose breaker admits a call, preferring ones not in ``avoid``"""
+        candidates = [e for e in self.endpoints if e not in avoid]
+        if not strict:
+            candidates += [e for e in self.endpoints if e in avoid]
+        return next((e for e in candidates if e.breaker.allow()), None)
+
+    async def _pump(self, endpoint: _Endpoint, request: Tuple, queue: asyncio.Queue) -> None:
+        # The stream is consumed entirely inside this task, so cancelling it closes the request cleanly
+        messages, tool_specs, system_prompt, kwargs = request
+        try:
+            async for event in endpoint.model.stream(messages, tool_specs, system_prompt, **kwargs):
+                queue.put_nowait((endpoint, 'event', event))
+            queue.put_nowait((endpoint, 'end', None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            queue.put_nowait((endpoint, 'error', e))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Hashable, Iterator, List, Optional
+
+from strands import Agent
+from strands.agent import AgentResult
+from strands.telemetry.metrics import EventLoopMetrics
+
+from utils.event_loop import agent_loop
+from utils.prompts import prompt_manager
+from utils.streaming import emit
+
+
+class AgentPool:
+    """Idle agents of one kind, reused across calls instead of rebuilt each time.
+
+    An Agent can only run one invocation at a time, so each concurrent caller
+    leases its own instance; the pool grows to the peak concurrency and keeps at
+    most ``max_idle`` of them. Every lease starts with an empty conversation.
+    """
+
+    def __init__(self, build: Callable[[], Agent], max_idle: int = 8):
+        self.build = build
+        self.max_idle = max_idle
+        self._idle: List[Agent] = []
+        self._lock = threading.Lock()
+        self.created = 0
+
+    @contextmanager
+    def lease(self) -> Iterator[Agent]:
+        with self._lock:
+            agent = self._idle.pop() if self._idle else None
+        if agent is None:
+            agent = self.build()
+            self.created += 1
+        try:
+            yield agent
+        finally:
+            # Specialist calls are single-shot; drop the turn so nothing leaks into the next lease
+            agent.messages = []
+            # Metrics otherwise keep every past invocation of a reused agent
+            agent.event_loop_metrics = EventLoopMetrics()
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(agent)
+
+
+_pools: "OrderedDict[Hashable, AgentPool]" = OrderedDict()
+_pools_lock = threading.Lock()
+MAX_POOLS = 32
+
+
+def agent_pool(key: Hashable, build: Callable[[], Agent]) -> AgentPool:
+    """The process-wide pool for ``key``, created with ``build`` on first use"""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = AgentPool(build)
+            # Keys tied to replaced resources (e.g. a reconnected MCP session) age out
+            while len(_pools) > MAX_POOLS:
+                _pools.popitem(last=False)
+        else:
+            _pools.move_to_end(key)
+        return pool
+
+
+async def arun_agent(agent: Agent, prompt: str) -> AgentResult:
+    """Invoke an agent from a coroutine already running on the shared agent loop.
+
+    Specialists run as async coordinator tools, i.e. on the agent loop itself. Awaiting
+    their sub-agent here, instead of blocking a worker thread in ``run_agent`` until the
+    same loop finishes it, keeps the loop's executor free for the sub-agent's own work.
+    """
+    emit('agent_start', agent=agent.name)
+    try:
+        result = await agent.invoke_async(prompt)
+    finally:
+        emit('agent_end', agent=agent.name)
+    # Tokens billed for this call alone, summed over its model round trips
+    invocation = result.metrics.latest_agent_invocation
+    if invocation is not None:
+        usage = invocation.usage
+        prompt_manager.record_usage(agent.name, usage)
+        emit('usage', agent=agent.name, input_tokens=usage.get('inputTokens', 0),
+             output_tokens=usage.get('outputTokens', 0))
+    return result
+
+
+def run_agent(agent: Agent, prompt: str, timeout: Optional[float] = None) -> AgentResult:
+    """Invoke an agent on the shared agent loop, where model HTTP connections are pooled"""
+    return agent_loop.run(arun_agent(agent, prompt), timeout)
@@ -1,19 +1,46 @@
 import sys
 import os
+import re
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from mcp.client.streamable_http import streamablehttp_client
+from typing import List
 from strands import Agent, tool
-from strands.tools.mcp.mcp_client import MCPClient
-from prompts.flight_prompt import FLIGHT_SYSTEM_PROMPT
 from model.moonshot import get_model
-from dotenv import load_dotenv
+from multi_agents.agent_factory import agent_pool, arun_agent
+from utils.conversation import SLOT_PATTERNS
+from utils.mcp_session import mcp_session_manager
+from utils.prompts import prompt_manager
+from utils.streaming import streaming_callback
 
-load_dotenv()
+# Only the tools a query needs are attached, since every tool schema is sent on each model call.
+# A query matching no group gets all tools.
+TOOL_SELECTION_ENABLED = os.getenv('FLIGHT_TOOL_SELECTION', 'true').lower() == 'true'
+TOOL_GROUPS = [
+    ([re.compile(r"\b(search|find|show|available|flights? (from|to)|cheapest|options?|depart\w*)\b", re.IGNORECASE),
+      SLOT_PATTERNS['flight_numbers']],
+     {'search_flights', 'get_flight_details'}),
+    ([re.compile(r"\b(book|reserve|buy|purchase|passengers?)\b|\bbooking (a|an|for|\d)\b", re.IGNORECASE)],
+     {'search_flights', 'get_flight_details', 'create_booking', 'create_bookings_bulk'}),
+    ([re.compile(r"\b(status|cancel\w*|my booking|booking reference)\b", re.IGNORECASE),
+      SLOT_PATTERNS['booking_references']],
+     {'get_booking_status', 'cancel_booking', 'get_flight_details'}),
+]
+
+
+def _select_tools(query: str, tools: List) -> List:
+    """The subset of MCP tools relevant to the query"""
+    if not TOOL_SELECTION_ENABLED:
+        return tools
+    names = set()
+    for patterns, group in TOOL_GROUPS:
+        if any(pattern.search(query) for pattern in patterns):
+            names |= group
+    selected = [tool for tool in tools if tool.tool_name in names]
+    return selected or tools
 
 
 @tool
-def flight_agent(query: str) -> str:
+async def flight_agent(query: str) -> str:
     """
     Process and respond to Flight related queries.
 
@@ -26,18 +53,22 @@ def flight_agent(query: str) -> str:
     formatted_query = f"Analyze and respond to this flight related query: {query}"
 
     try:
-        streamable_http_mcp_client = MCPClient(lambda: streamablehttp_client(os.getenv('MCP_SERVER_URL')))
-        # Create an agent with MCP tools
-        with streamable_http_mcp_client:
-            # Get the tools from the MCP server
-            tools = streamable_http_mcp_client.list_tools_sync()
-
-            f_agent = Agent(
+        # Lease a warm MCP session; tools are cached per session
+        async with mcp_session_manager.asession() as (client, tools):
+            tools = _select_tools(query, tools)
+            # Agents hold the session's tool objects, so they are pooled per client and tool set
+            pool_key = ('flight', id(client), tuple(tool.tool_name for tool in tools))
+            build = lambda: Agent(
+                name="flight_agent",
                 model=get_model(),
-                system_prompt=FLIGHT_SYSTEM_PROMPT,
+                system_prompt=prompt_manager.system_prompt('flight'),
+                callback_handler=streaming_callback("flight_agent"),
                 tools=[] + tools,
             )
-            agent_response = f_agent(formatted_query)
+            with agent_pool(pool_key, build).lease() as f_agent:
+                agent_response = await arun_agent(f_agent, formatted_query)
+                # Transport failures come back as tool results, not exceptions
+                mcp_session_manager.check_results(client, f_agent.messages)
             text_response = str(agent_response)
 
             if len(text_response) > 0:
@@ -2,14 +2,26 @@ import os
 import sys
 
 from model.moonshot import get_model
+from multi_agents.agent_factory import agent_pool, arun_agent
+from utils.streaming import streaming_callback
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from strands import tool, Agent
 
 
+def _build_general_agent() -> Agent:
+    return Agent(
+        name="general_agent",
+        model=get_model(),
+        system_prompt="You are a general assistant. Provide clear and concise answers to user queries.",
+        callback_handler=streaming_callback("general_agent"),
+        tools=[]
+    )
+
+
 @tool
-def generat_agent(query: str) -> str:
+async def generat_agent(query: str) -> str:
     """
     Process and respond to general queries.
 
@@ -22,13 +34,8 @@ def generat_agent(query: str) -> str:
     formatted_query = f"""Analyze and respond to this general query: {query}"""
 
     try:
-        g_agent = Agent(
-            model=get_model(),
-            system_prompt="You are a general assistant. Provide clear and concise answers to user queries.",
-            callback_handler=None,
-            tools=[]
-        )
-        response = g_agent(formatted_query)
+        with agent_pool('general', _build_general_agent).lease() as g_agent:
+            response = await arun_agent(g_agent, formatted_query)
         return str(response)
     except Exception as e:
         return f"Error processing your policy related query: {str(e)}"
@@ -1,38 +1,215 @@
+import asyncio
+import hashlib
+import json
+import logging
 import os
+import re
 import sys
+import time
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
+import numpy as np
 from strands import Agent, tool
+from multi_agents.agent_factory import agent_pool, arun_agent
+from utils.bm25 import tokenize
+from utils.conversation import current_message
 from utils.embeddings import embedding_service
-from prompts.policy_prompt import POLICY_SYSTEM_PROMPT
+from utils.prompts import prompt_manager
+from utils.semantic_cache import SemanticCache, quantity_tokens
+from utils.streaming import streaming_callback
+from utils.vector_index import LocalVectorIndex, PolicyIndexMirror
 from model.moonshot import get_model
 
 from config.database import db_manager
 
+logger = logging.getLogger(__name__)
+
+# In-process mirror of the TiDB policy table; TiDB stays the source of truth
+LOCAL_INDEX_ENABLED = os.getenv('POLICY_LOCAL_INDEX', 'true').lower() == 'true'
+policy_index = PolicyIndexMirror(db_manager, 'airline_policies')
+
+SEARCH_K = int(os.getenv('POLICY_SEARCH_K', 3))
+DISTANCE_THRESHOLD = float(os.getenv('POLICY_DISTANCE_THRESHOLD', 0.7))
+BM25_MIN_SCORE = float(os.getenv('POLICY_BM25_MIN_SCORE', 1.5))
+RRF_K = int(os.getenv('POLICY_RRF_K', 60))
+# Lexical leg of the TiDB fallback: terms per query, and how many a policy must contain
+TIDB_LEXICAL_MAX_TERMS = 8
+TIDB_LEXICAL_MIN_TERMS = 2
+
+# Answers reused for near-duplicate questions that retrieve the same policies
+ANSWER_CACHE_ENABLED = os.getenv('POLICY_ANSWER_CACHE', 'true').lower() == 'true'
+answer_cache = SemanticCache(
+    radius=float(os.getenv('POLICY_ANSWER_CACHE_RADIUS', 0.92)),
+    max_entries=int(os.getenv('POLICY_ANSWER_CACHE_MAX_ENTRIES', 2048)),
+    ttl=float(os.getenv('POLICY_ANSWER_CACHE_TTL', 86400))
+)
+
+# Keywords that pin a query to one policy category; ambiguous queries search every category
+CATEGORY_KEYWORDS = {
+    'baggage': ['baggage', 'bag', 'bags', 'luggage', 'suitcase', 'carry-on', 'carry on', 'liquids', 'prohibited', 'kg'],
+    'booking': ['cancel', 'cancellation', 'change my ticket', 'change fee', 'rebook', 'seat selection', 'choose a seat', 'pick a seat'],
+    'checkin': ['check-in', 'check in', 'checkin', 'boarding pass', 'wheelchair', 'special assistance', 'passport'],
+    'travel': ['pet', 'pets', 'dog', 'cat', 'animal', 'unaccompanied', 'minor', 'child traveling alone'],
+    'compensation': ['delay', 'delayed', 'compensation', 'overbooked', 'overbooking', 'bumped', 'denied boarding'],
+    'loyalty': ['frequent flyer', 'loyalty', 'miles', 'points', 'elite', 'status tier'],
+}
+CATEGORY_PATTERNS = {
+    category: re.compile(r"\b(" + "|".join(re.escape(keyword) for keyword in keywords) + r")\b", re.IGNORECASE)
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+
+
+# Terms that change a policy answer while barely moving the query embedding; together with
+# quantities they must match exactly before a cached answer is reused
+ENTITY_TERMS = sorted({keyword for keywords in CATEGORY_KEYWORDS.values() for keyword in keywords} | {
+    'basic economy', 'main cabin', 'premium', 'business', 'first class', 'bronze', 'silver', 'gold', 'platinum',
+    'domestic', 'international', 'eu', 'infant', 'child', 'service animal', 'refund', 'voucher'
+} - {'kg'}, key=len, reverse=True)  # units are part of the quantity tokens
+ENTITY_PATTERN = re.compile(r"\b(" + "|".join(re.escape(term) for term in ENTITY_TERMS) + r")\b", re.IGNORECASE)
+
+
+def _query_entities(query: str) -> frozenset:
+    return quantity_tokens(query) | {match.lower() for match in ENTITY_PATTERN.findall(query)}
+
+
+def _infer_category(query: str) -> Optional[str]:
+    """Category the query unambiguously refers to, or None"""
+    matches = [category for category, pattern in CATEGORY_PATTERNS.items() if pattern.search(query)]
+    return matches[0] if len(matches) == 1 else None
+
+
+def _tidb_search(query_embedding: List[float], k: int, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Vector search against TiDB directly, used when the local index is unavailable"""
+    if category is not None:
+        # The indexed generated column narrows the scan to one category before ranking
+        rows = db_manager.execute_query("""
+            SELECT id, document, meta, VEC_COSINE_DISTANCE(embedding, :embedding) AS distance
+            FROM airline_policies
+            WHERE category = :category
+            ORDER BY distance
+            LIMIT :k
+        """, {'embedding': json.dumps(query_embedding), 'category': category, 'k': k})
+        return [
+            {
+                'id': row.id,
+                'document': row.document,
+                'metadata': json.loads(row.meta) if isinstance(row.meta, str) else row.meta,
+                'distance': row.distance
+            }
+            for row in rows
+        ]
+
+    vector_client = db_manager.get_vector_client()
+    results = vector_client.query(query_vector=query_embedding, k=k)
+    return [
+        {'id': result.id, 'document': result.document, 'metadata': result.metadata, 'distance': result.distance}
+        for result in results
+    ]
+
+
+def _tidb_lexical_search(query: str, k: int, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Keyword search against TiDB, ranked by how many query terms a policy contains.
+
+    The fallback's stand-in for the mirror's BM25 leg, so exact terms such as "20kg" or
+    "unaccompanied minor" still count when the local index is off or fails to load.
+    Terms are matched as whole tokens, split like the BM25 tokenizer splits them.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:TIDB_LEXICAL_MAX_TERMS]
+    if not terms:
+        return []
+    params: Dict[str, Any] = {'k': k, 'min_terms': min(TIDB_LEXICAL_MIN_TERMS, len(terms))}
+    matches = []
+    for n, term in enumerate(terms):
+        boundary = '0-9' if term.isdigit() else 'a-z'
+        params[f"term{n}"] = f"(^|[^{boundary}]){term}([^{boundary}]|$)"
+        matches.append(f"(LOWER(CONCAT(COALESCE(JSON_UNQUOTE(JSON_EXTRACT(meta, '$.title')), ''), ' ', document)) "
+                       f"REGEXP :term{n})")
+    where = "WHERE category = :category" if category is not None else ""
+    if category is not None:
+        params['category'] = category
+
+    rows = db_manager.execute_query(f"""
+        SELECT id, document, meta, {' + '.join(matches)} AS matched
+        FROM airline_policies
+        {where}
+        HAVING matched >= :min_terms
+        ORDER BY matched DESC
+        LIMIT :k
+    """, params)
+    return [
+        {
+            'id': row.id,
+            'document': row.document,
+            'metadata': json.loads(row.meta) if isinstance(row.meta, str) else row.meta,
+            'score': row.matched
+        }
+        for row in rows
+    ]
+
+
+def _fuse(rankings: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Reciprocal-rank fusion of several ranked result lists"""
+    fused: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking):
+            entry = fused.setdefault(result['id'], {**result, 'rrf_score': 0.0})
+            entry['rrf_score'] += 1.0 / (RRF_K + rank + 1)
+    return sorted(fused.values(), key=lambda entry: entry['rrf_score'], reverse=True)
 
-def _search_policies(query) -> List[Dict]:
-    """Search policies using vector search"""
-    try:
-        # Get vector client
-        vector_client = db_manager.get_vector_client()
 
+def _search_policies(query, k: int = SEARCH_K, category: Optional[str] = None,
+                     index: Optional[LocalVectorIndex] = None) -> List[Dict]:
+    """Search policies with hybrid BM25 + vector retrieval, optionally within one category.
+
+    ``index`` replaces the TiDB mirror, e.g. for offline evaluation.
+    """
+    try:
         # Generate embedding
         query_embedding = embedding_service.embed_text(query)
 
-        # Perform search
-        results = vector_client.query(query_vector=query_embedding, k=3)
+        inferred = category is None
+        if inferred:
+            category = _infer_category(query)
+
+        # Retrieve a wider candidate set from each retriever, then fuse
+        candidates = k * 3
+        if index is None and LOCAL_INDEX_ENABLED:
+            index = policy_index.get_index()
+
+        def retrieve(category):
+            if index is not None:
+                vector_results = index.search(query_embedding, k=candidates, category=category)
+                lexical_results = [r for r in index.lexical_search(query, k=candidates, category=category)
+                                   if r['score'] >= BM25_MIN_SCORE]
+            else:
+                vector_results = _tidb_search(query_embedding, candidates, category)
+                try:
+                    lexical_results = _tidb_lexical_search(query, candidates, category)
+                except Exception as e:
+                    logger.warning(f"Lexical policy search unavailable, using vector search only: {e}")
+                    lexical_results = []
+            vector_results = [r for r in vector_results if r['distance'] < DISTANCE_THRESHOLD]
+            return _fuse([vector_results, lexical_results])[:k]
+
+        results = retrieve(category)
+        if not results and inferred and category is not None:
+            # A keyword guess must never hide policies the unfiltered search would find
+            results = retrieve(None)
 
         policies = []
         for result in results:
-            if result.distance < 0.7:
-                policies.append({
-                    'title': result.metadata.get('title', ''),
-                    'content': result.document,
-                    'category': result.metadata.get('category', ''),
-                    'similarity_score': result.distance
-                })
+            policies.append({
+                'id': result['id'],
+                'title': result['metadata'].get('title', ''),
+                'content': result['document'],
+                'category': result['metadata'].get('category', ''),
+                # Rows ingested before content hashes were stored fall back to hashing the text
+                'content_hash': result['metadata'].get('content_hash')
+                                or hashlib.sha256(result['document'].encode()).hexdigest(),
+                'similarity_score': result['rrf_score']
+            })
 
         return policies
 
@@ -41,13 +218,23 @@ def _search_policies(query) -> List[Dict]:
         return []
 
 
+def _build_policy_agent() -> Agent:
+    return Agent(
+        name="policy_agent",
+        model=get_model(),
+        system_prompt=prompt_manager.system_prompt('policy'),
+        callback_handler=streaming_callback("policy_agent"),
+    )
+
+
 @tool
-def policy_agent(query: str) -> str:
+async def policy_agent(query: str, category: Optional[str] = None) -> str:
     """
     Process and respond to Policy related queries.
 
     Args:
         query: Policy related question or request
+        category: Optional policy category to search within: baggage, booking, checkin, travel, compensation or loyalty
 
     Returns:
         A helpful response addressing the Policy query.
@@ -57,21 +244,40 @@ def policy_agent(query: str) -> str:
     """
 
     try:
-        policies = _search_policies(query)
+        # Unknown categories from the coordinator fall back to inference
+        if category is not None and category.lower() not in CATEGORY_KEYWORDS:
+            category = None
+        category = category.lower() if category else None
+        # Retrieval and the answer cache look at the message alone; the conversation
+        # context only reaches the model through formatted_query
+        message = current_message(query)
+        # Embedding and database lookups block; keep them off the shared agent loop
+        policies = await asyncio.to_thread(_search_policies, message, category=category)
 
         if policies:
-            p_agent = Agent(
-                model=get_model(),
-                system_prompt=POLICY_SYSTEM_PROMPT,
-            )
+            # The embedding is already cached by the search above
+            query_embedding = embedding_service.embed_text(message)
+            # Re-ingestion keeps a policy's ID but changes its content hash, so an edited policy
+            # misses even without the mirror's table watermark (local index off or not loaded)
+            policy_ids = sorted(f"{p['id']}:{p['content_hash']}" for p in policies)
+            version = policy_index.version
+            entities = _query_entities(message)
+            if ANSWER_CACHE_ENABLED:
+                cached = answer_cache.lookup(query_embedding, policy_ids, version, entities)
+                if cached is not None:
+                    return cached
 
             final_query = formatted_query + "\n".join(
                 [f"- title: {p['title']}\ncontent: {p['content']}\ncategory: {p['category']}" for p in policies])
 
-            agent_response = p_agent(final_query)
+            with agent_pool('policy', _build_policy_agent).lease() as p_agent:
+                agent_response = await arun_agent(p_agent, final_query)
             text_response = str(agent_response)
 
             if len(text_response) > 0:
+                # An answer shaped by one conversation's context is not reused for others
+                if ANSWER_CACHE_ENABLED and message == query:
+                    answer_cache.store(query_embedding, policy_ids, text_response, version, entities)
                 return text_response
 
         else:
@@ -79,3 +285,64 @@ def policy_agent(query: str) -> str:
 
     except Exception as e:
         return f"Error processing your policy related query: {str(e)}"
+
+
+def evaluate_retrieval(path: str = 'data/policy_queries.json',
+                       policies_path: str = 'data/airline_policies.json') -> Dict[str, Any]:
+    """Offline relevance and latency of policy retrieval over the policies file, no database needed.
+
+    Each labelled query is searched vector-only (the original ``distance < 0.7``, k=3
+    lookup), BM25-only and with the hybrid retriever; a hit means the expected policy
+    is among the results. Latencies exclude the query embedding, which is computed once.
+    """
+    from utils.benchmark import latency_summary
+
+    with open(policies_path) as f:
+        policies = json.load(f)
+    with open(path) as f:
+        queries = json.load(f)
+
+    index = LocalVectorIndex(
+        [f"{p['category']}/{p['title']}" for p in policies],
+        [p['content'] for p in policies],
+        [{'category': p['category'], 'title': p['title']} for p in policies],
+        np.asarray(embedding_service.embed_texts([p['content'] for p in policies]), dtype=np.float32)
+    )
+    for item in queries:
+        embedding_service.embed_text(item['query'])
+
+    def vector_only(query: str) -> List[str]:
+        results = index.search(embedding_service.embed_text(query), k=SEARCH_K)
+        return [r['metadata']['title'] for r in results if r['distance'] < DISTANCE_THRESHOLD]
+
+    def lexical_only(query: str) -> List[str]:
+        return [r['metadata']['title'] for r in index.lexical_search(query, k=SEARCH_K) if r['score'] >= BM25_MIN_SCORE]
+
+    def hybrid(query: str) -> List[str]:
+        return [p['title'] for p in _search_policies(query, index=index)]
+
+    report: Dict[str, Any] = {'policies': len(policies), 'queries': len(queries), 'k': SEARCH_K}
+    for name, retrieve in (('vector', vector_only), ('bm25', lexical_only), ('hybrid', hybrid)):
+        hits, empty, reciprocal_ranks, latencies = 0, 0, 0.0, []
+        for item in queries:
+            start = time.perf_counter()
+            titles = retrieve(item['query'])
+            latencies.append(time.perf_counter() - start)
+            empty += not titles
+            if item['title'] in titles:
+                hits += 1
+                reciprocal_ranks += 1 / (titles.index(item['title']) + 1)
+        report[name] = {
+            'hit_rate': round(hits / len(queries), 3),
+            'mrr': round(reciprocal_ranks / len(queries), 3),
+            'empty': empty,
+            **latency_summary(latencies)
+        }
+    return report
+
+
+if __name__ == "__main__":
+    # Usage: python -m multi_agents.policy_agent [labelled_queries.json]
+    from utils.benchmark import print_report
+
+    print_report(evaluate_retrieval(*sys.argv[1:2]))
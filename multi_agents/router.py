@@ -0,0 +1,220 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from utils.embeddings import embedding_service
+
+INTENTS = ('flight', 'policy', 'support', 'general')
+
+# High-precision patterns; a query matching rules for two intents is treated as multi-intent
+INTENT_RULES = {
+    'flight': [
+        re.compile(r"\bAN\d{3}\b", re.IGNORECASE),
+        re.compile(r"\b[A-Z]{3}\s*(to|-|–)\s*[A-Z]{3}\b"),
+        re.compile(r"\b(find|search|show|any|cheapest|next)\b.*\bflights?\b", re.IGNORECASE),
+        re.compile(r"\bflights? (from|to|on)\b", re.IGNORECASE),
+        re.compile(r"\bbook\b.*\b(flight|ticket|seat)s?\b", re.IGNORECASE),
+        re.compile(r"\b(booking|reservation)\b.*\b(status|reference)\b|\b(status|reference)\b.*\b(booking|reservation)\b", re.IGNORECASE),
+        re.compile(r"\bcancel my (booking|reservation)\b", re.IGNORECASE),
+    ],
+    'policy': [
+        re.compile(r"\b(polic(y|ies)|allowance|carry-on|checked bag(gage)?|baggage|prohibited|liquids)\b", re.IGNORECASE),
+        re.compile(r"\b(pets?|dog|cat|animal|unaccompanied|minor|fly alone)\b", re.IGNORECASE),
+        re.compile(r"\b(compensation|overbook(ed|ing)?|frequent flyer|miles|loyalty|wheelchair)\b", re.IGNORECASE),
+        re.compile(r"\b(change|cancellation|seat selection) fees?\b|\bfee for\b", re.IGNORECASE),
+        re.compile(r"\bhow early\b.*\bcheck[- ]?in\b", re.IGNORECASE),
+    ],
+    'support': [
+        re.compile(r"\b(complain|complaint|escalate|manager|urgent|urgently|emergency|charged twice)\b", re.IGNORECASE),
+        re.compile(r"\b(lost|damaged|missing|stolen)\b", re.IGNORECASE),
+        re.compile(r"\b(speak|talk) to (a |an )?(human|person|agent|someone)\b|\breport an? (issue|problem)\b", re.IGNORECASE),
+    ],
+    'general': [
+        re.compile(r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening))\b", re.IGNORECASE),
+        re.compile(r"\b(weather|time zone|currency|things to do|restaurant)\b", re.IGNORECASE),
+    ],
+}
+
+# Replies that only make sense with the conversation history go to the coordinator
+FOLLOW_UP_PATTERN = re.compile(
+    r"^\s*(yes|yeah|yep|no|nope|ok|okay|sure|please do|do it|book it|go ahead|that one|the (first|second|third|last) one)\b",
+    re.IGNORECASE
+)
+
+# Clause boundaries used to split multi-intent messages into per-agent sub-queries: sentence ends
+# and explicit connectors. A bare "and" joins too much within one request ("for me and my dog"),
+# so it only splits when a new question or instruction follows it.
+CLAUSE_SPLIT = re.compile(
+    r"[.?!;]+(?:\s+|$)|,?\s+\b(?:and also|and then)\b\s+|"
+    r",?\s+\band\s+(?=(?:tell me|what|how|when|where|which|can|could|do|does|is|are|will|would)\b)",
+    re.IGNORECASE
+)
+# A usable sub-query has a few words and a verb (or asks a question)
+MIN_CLAUSE_WORDS = 3
+CLAUSE_VERB_PATTERN = re.compile(
+    r"\b(is|are|am|was|were|be|do|does|did|can|could|will|would|should|may|must|have|has|need|want|"
+    r"book|find|search|show|cancel|change|check|bring|take|fly|travel|get|tell|know|explain|reserve|buy|"
+    r"pay|help|give|allow(ed)?|what|how|when|where|which|why)\b",
+    re.IGNORECASE
+)
+
+
+class IntentRouter:
+    """Cheap pre-routing of user messages to a single specialist agent.
+
+    Regex rules and a nearest-centroid classifier over the MiniLM embeddings of
+    labeled examples vote on the intent. ``route`` returns an intent only when the
+    query is confidently single-intent; otherwise the coordinator LLM decides.
+    """
+
+    def __init__(self,
+                 examples_path: str = os.getenv('ROUTER_EXAMPLES_PATH', 'data/routing_examples.json'),
+                 min_similarity: float = float(os.getenv('ROUTER_MIN_SIMILARITY', 0.35)),
+                 min_margin: float = float(os.getenv('ROUTER_MIN_MARGIN', 0.05))):
+        self.examples_path = examples_path
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def load_examples(self) -> List[Dict[str, str]]:
+        with open(self.examples_path, 'r') as f:
+            return json.load(f)
+
+    @property
+    def centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    examples = self.load_examples()
+                    embeddings = _normalize(np.asarray(
+                        embedding_service.embed_texts([example['query'] for example in examples]), dtype=np.float32
+                    ))
+                    labels = [example['intent'] for example in examples]
+                    self._centroids = _build_centroids(embeddings, labels)
+        return self._centroids
+
+    def rule_intents(self, query: str) -> List[str]:
+        return [intent for intent, patterns in INTENT_RULES.items() if any(p.search(query) for p in patterns)]
+
+    def classify(self, query: str) -> Tuple[str, float, float]:
+        """Nearest-centroid intent with its cosine similarity and margin over the runner-up"""
+        query_embedding = _normalize(np.asarray([embedding_service.embed_text(query)], dtype=np.float32))[0]
+        return _nearest(self.centroids, query_embedding)
+
+    def route(self, query: str) -> Dict[str, Any]:
+        """Decide where a message goes; ``intent`` is None when the coordinator should handle it"""
+        if FOLLOW_UP_PATTERN.search(query) or len(query.split()) < 2:
+            return {'intent': None, 'method': 'follow_up'}
+
+        rule_intents = self.rule_intents(query)
+        if len(rule_intents) > 1:
+            return {'intent': None, 'method': 'multi_intent', 'candidates': rule_intents}
+
+        intent, similarity, margin = self.classify(query)
+        confident = similarity >= self.min_similarity and margin >= self.min_margin
+
+        if rule_intents:
+            # A confident classifier disagreeing with the rules signals an ambiguous message
+            if confident and intent != rule_intents[0]:
+                return {'intent': None, 'method': 'conflict', 'candidates': [rule_intents[0], intent]}
+            return {'intent': rule_intents[0], 'method': 'rules', 'similarity': similarity}
+        if confident:
+            return {'intent': intent, 'method': 'centroid', 'similarity': similarity, 'margin': margin}
+        return {'intent': None, 'method': 'low_confidence', 'similarity': similarity, 'margin': margin}
+
+    def split_by_intent(self, query: str, intents: List[str]) -> Dict[str, str]:
+        """Sub-query for each intent, falling back to the whole message when clauses don't split cleanly"""
+        assigned: List[Tuple[Optional[str], str]] = []
+        for clause in filter(None, (part.strip() for part in CLAUSE_SPLIT.split(query))):
+            clause_intents = [intent for intent in self.rule_intents(clause) if intent in intents]
+            if len(clause_intents) > 1:
+                return {intent: query for intent in intents}
+            if clause_intents or not assigned:
+                assigned.append((clause_intents[0] if clause_intents else None, clause))
+            else:
+                # Clauses naming no intent ("for two people") belong to the one before
+                previous_intent, previous = assigned[-1]
+                assigned[-1] = (previous_intent, f"{previous} {clause}")
+
+        if assigned and assigned[0][0] is None and len(assigned) > 1:
+            leading = assigned.pop(0)[1]
+            assigned[0] = (assigned[0][0], f"{leading} {assigned[0][1]}")
+
+        sub_queries: Dict[str, str] = {}
+        for intent, clause in assigned:
+            if intent is not None:
+                sub_queries[intent] = f"{sub_queries[intent]} {clause}" if intent in sub_queries else clause
+        if set(sub_queries) != set(intents) or not all(map(_is_clause, sub_queries.values())):
+            return {intent: query for intent in intents}
+        return sub_queries
+
+    def evaluate(self) -> Dict[str, Any]:
+        """Leave-one-out routing accuracy and latency over the labeled examples"""
+        examples = self.load_examples()
+        queries = [example['query'] for example in examples]
+        labels = [example['intent'] for example in examples]
+        embeddings = _normalize(np.asarray(embedding_service.embed_texts(queries), dtype=np.float32))
+
+        routed = correct = 0
+        latencies = []
+        for i, query in enumerate(queries):
+            # Centroids without the held-out example, so it is never scored against itself
+            keep = [j for j in range(len(queries)) if j != i]
+            self._centroids = _build_centroids(embeddings[keep], [labels[j] for j in keep])
+            started = time.perf_counter()
+            decision = self.route(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if decision['intent'] is not None:
+                routed += 1
+                correct += decision['intent'] == labels[i]
+        self._centroids = None
+
+        return {
+            'examples': len(queries),
+            'fast_path_rate': round(routed / len(queries), 4),
+            'fast_path_accuracy': round(correct / routed, 4) if routed else 0.0,
+            'mean_routing_ms': round(sum(latencies) / len(latencies), 3),
+            'p95_routing_ms': round(sorted(latencies)[int(0.95 * (len(latencies) - 1))], 3)
+        }
+
+
+def _is_clause(text: str) -> bool:
+    return len(text.split()) >= MIN_CLAUSE_WORDS and CLAUSE_VERB_PATTERN.search(text) is not None
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _build_centroids(embeddings: np.ndarray, labels: List[str]) -> np.ndarray:
+    return _normalize(np.stack([
+        embeddings[[i for i, label in enumerate(labels) if label == intent]].mean(axis=0) for intent in INTENTS
+    ]))
+
+
+def _nearest(centroids: np.ndarray, query_embedding: np.ndarray) -> Tuple[str, float, float]:
+    similarities = centroids @ query_embedding
+    best, runner_up = np.argsort(-similarities)[:2]
+    return INTENTS[best], float(similarities[best]), float(similarities[best] - similarities[runner_up])
+
+
+intent_router = IntentRouter()
+
+
+if __name__ == "__main__":
+    # Routing accuracy on the labeled sample set. Every fast-routed message saves one
+    # coordinator LLM round trip, so fast_path_rate is the share of that latency removed.
+    report = intent_router.evaluate()
+    for key, value in report.items():
+        print(f"{key}: {value}")
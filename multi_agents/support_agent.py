@@ -4,6 +4,8 @@ import uuid
 from datetime import datetime
 
 from model.moonshot import get_model
+from multi_agents.agent_factory import agent_pool, arun_agent
+from utils.streaming import streaming_callback
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -52,8 +54,18 @@ Is there anything else I can help you with?
     return content
 
 
+def _build_support_agent() -> Agent:
+    return Agent(
+        name="support_agent",
+        model=get_model(),
+        system_prompt="You are a specialized Customer Support Agent for AirlineNexus, an intelligent airline assistant system. Your role is to handle complex customer issues, create support tickets, and provide escalation management.",
+        callback_handler=streaming_callback("support_agent"),
+        tools=[create_support_ticket, format_ticket_response]
+    )
+
+
 @tool
-def support_agent(query: str) -> str:
+async def support_agent(query: str) -> str:
     """
     Process and respond to Support related queries.
     It will analyze the complexity of the query and decide whether to create a support ticket or provide a general response.
@@ -70,14 +82,8 @@ def support_agent(query: str) -> str:
         complexity = _analyze_complexity(formatted_query)
 
         if complexity["needs_ticket"]:
-            s_agent = Agent(
-                model=get_model(),
-                system_prompt="You are a specialized Customer Support Agent for AirlineNexus, an intelligent airline assistant system. Your role is to handle complex customer issues, create support tickets, and provide escalation management.",
-                callback_handler=None,
-                tools=[create_support_ticket, format_ticket_response]
-            )
-
-            response = s_agent(formatted_query)
+            with agent_pool('support', _build_support_agent).lease() as s_agent:
+                response = await arun_agent(s_agent, formatted_query)
             return str(response)
         else:
             return "Not required to create a support ticket. You can give a general response to the user."
@@ -8,7 +8,9 @@ import time
 # Add the project root to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from airline_nexus import airline_agent
+from airline_nexus import handle_session_query
+from utils.jobs import JobQueueFullError, JobRunner
+from utils.sessions import session_manager
 
 # Page configuration
 st.set_page_config(
@@ -204,10 +206,25 @@ st.markdown("""
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
-if "conversation_history" not in st.session_state:
-    st.session_state.conversation_history = []
+if "session_id" not in st.session_state:
+    # Agent memory lives in the session manager; the browser session only keeps its id
+    st.session_state.session_id = session_manager.create().id
 if "processing" not in st.session_state:
     st.session_state.processing = False
+if "job" not in st.session_state:
+    st.session_state.job = None
+    # Position in messages of the user message the job answers
+    st.session_state.job_index = None
+
+
+@st.cache_resource
+def get_job_runner():
+    """One worker pool shared by every browser session of this server"""
+    return JobRunner(
+        handle_session_query,
+        max_workers=int(os.getenv('UI_MAX_CONCURRENT_REQUESTS', 8)),
+        max_queue=int(os.getenv('UI_MAX_QUEUED_REQUESTS', 32))
+    )
 
 def create_typing_indicator():
     return """
@@ -253,8 +270,11 @@ with st.sidebar:
     # Clear conversation button - more compact
     if st.button("🗑️ Clear Chat", use_container_width=True, type="secondary"):
         st.session_state.messages = []
-        st.session_state.conversation_history = []
+        session_manager.delete(st.session_state.session_id)
+        st.session_state.session_id = session_manager.create().id
         st.session_state.processing = False
+        st.session_state.job = None
+        st.session_state.job_index = None
         st.success("Conversation cleared!")
         time.sleep(0.5)
         st.rerun()
@@ -292,7 +312,8 @@ with st.sidebar:
     ]
     
     for icon, query in example_queries:
-        if st.button(f"{icon} {query}", key=f"example_{hash(query)}", use_container_width=True):
+        if st.button(f"{icon} {query}", key=f"example_{hash(query)}", use_container_width=True,
+                     disabled=st.session_state.processing):
             # Set processing state first
             st.session_state.processing = True
             st.session_state.messages.append({"role": "user", "content": query, "timestamp": datetime.now()})
@@ -376,7 +397,8 @@ if st.session_state.processing:
 
 # Chat input with enhanced placeholder
 input_placeholder = "✈️ Ask about flights, policies, support, or general travel questions..."
-if prompt := st.chat_input(input_placeholder, key="chat_input"):
+# Input is off while an answer streams, so a new prompt never lands on the running job
+if prompt := st.chat_input(input_placeholder, key="chat_input", disabled=st.session_state.processing):
     # Add user message with timestamp
     user_message = {
         "role": "user", 
@@ -391,14 +413,62 @@ if prompt := st.chat_input(input_placeholder, key="chat_input"):
 if st.session_state.processing and st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
     latest_prompt = st.session_state.messages[-1]["content"]
     
+    # The agent runs on the shared worker pool; this script run only renders its events.
+    # A rerun mid-answer keeps the job handle and replays the events from the start.
+    # A job started for an earlier message (a prompt that slipped in mid-answer) is
+    # finished first and its reply placed after that message; the next run submits
+    # the new prompt.
+    if st.session_state.job is None:
+        try:
+            st.session_state.job = get_job_runner().submit(
+                latest_prompt, session=session_manager.get(st.session_state.session_id)
+            )
+            st.session_state.job_index = len(st.session_state.messages) - 1
+        except JobQueueFullError:
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": "We're handling a lot of requests right now. Please try again in a moment.",
+                "timestamp": datetime.now(),
+                "error": True
+            })
+            st.session_state.processing = False
+            st.rerun()
+    job = st.session_state.job
+    reply_at = st.session_state.job_index + 1
+
+    # Streamed answer renders here while agent progress shows in the status box
+    answer_placeholder = st.empty()
+    answer_agents = ["coordinator"]
+    streamed = ""
+
     # Show processing status
     with st.status("🤖 Processing your request...", expanded=True) as status:
         st.write("🧠 Aviation intelligence. The secret to seamless travel")
+        if job.status == 'queued':
+            st.write("⏳ Waiting for a free assistant...")
         
         try:
-            # Get response from the airline agent
-            response = airline_agent(latest_prompt)
-            response_content = str(response)
+            # Render the job's events as they are produced
+            response_content = None
+            for event in job:
+                if event["type"] == "route":
+                    answer_agents = event["agents"]
+                elif event["type"] == "agent_start":
+                    label = event["agent"].replace("_", " ").title()
+                    st.write(f"🤖 {label} is working...")
+                    status.update(label=f"🤖 {label} is working...")
+                elif event["type"] == "tool":
+                    st.write(f"🔧 {event['tool'].replace('_', ' ')}")
+                    if event["agent"] in answer_agents:
+                        # Text before a tool call is preamble; the answer follows the tool result
+                        streamed = ""
+                elif event["type"] == "token" and len(answer_agents) == 1 and event["agent"] in answer_agents:
+                    streamed += event["data"]
+                    answer_placeholder.markdown(streamed + "▌")
+                elif event["type"] == "done":
+                    response_content = event["content"]
+                elif event["type"] == "error":
+                    raise RuntimeError(event["message"])
             
             st.write("✅ Response generated!")
             status.update(label="✅ Complete!", state="complete")
@@ -409,7 +479,7 @@ if st.session_state.processing and st.session_state.messages and st.session_stat
                 "content": response_content,
                 "timestamp": datetime.now()
             }
-            st.session_state.messages.append(assistant_message)
+            st.session_state.messages.insert(reply_at, assistant_message)
             
         except Exception as e:
             st.write("❌ Error occurred!")
@@ -422,11 +492,10 @@ if st.session_state.processing and st.session_state.messages and st.session_stat
                 "timestamp": datetime.now(),
                 "error": True
             }
-            st.session_state.messages.append(assistant_message)
+            st.session_state.messages.insert(reply_at, assistant_message)
         
-        finally:
-            # Clear processing state
-            st.session_state.processing = False
-            # Wait a moment to show the status update
-            time.sleep(1)
-            st.rerun()
+        # Reached only once the job finished; an interrupted run keeps the job for the next rerun
+        st.session_state.job = None
+        st.session_state.job_index = None
+        st.session_state.processing = st.session_state.messages[-1]["role"] == "user"
+        st.rerun()
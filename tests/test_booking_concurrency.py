@@ -0,0 +1,173 @@
+"""
+Concurrent booking against SQLite through FlightMCPTools._book_seats
+
+SQLite stands in for TiDB: its lock timeouts and unique-key violations are given the
+MySQL error codes run_in_transaction retries on, so the conditional seat UPDATE and
+the transaction replay run as they do in production. The live-database version of
+this check is ``python -m mcp_server.benchmarks oversell``.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import DatabaseManager, DUPLICATE_KEY_ERROR_CODE
+from mcp_server.flight_tools import BOOKING_RETRY_CODES, FlightMCPTools, SeatsUnavailableError
+
+LOCK_WAIT_TIMEOUT_ERROR_CODE = 1205
+
+SCHEMA = [
+    """
+    CREATE TABLE flights (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        flight_number VARCHAR(10) NOT NULL,
+        airline VARCHAR(50) NOT NULL,
+        departure_airport VARCHAR(10) NOT NULL,
+        arrival_airport VARCHAR(10) NOT NULL,
+        departure_time DATETIME NOT NULL,
+        arrival_time DATETIME NOT NULL,
+        price DECIMAL(10, 2) NOT NULL,
+        available_seats INT NOT NULL,
+        aircraft_type VARCHAR(50),
+        status VARCHAR(20) DEFAULT 'SCHEDULED'
+    )
+    """,
+    """
+    CREATE TABLE bookings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        booking_reference VARCHAR(10) UNIQUE NOT NULL,
+        flight_id INT NOT NULL,
+        passenger_name VARCHAR(100) NOT NULL,
+        passenger_email VARCHAR(100) NOT NULL,
+        seat_number VARCHAR(10),
+        booking_status VARCHAR(20) DEFAULT 'CONFIRMED',
+        booking_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (flight_id) REFERENCES flights(id)
+    )
+    """,
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'airline.db'}", connect_args={'timeout': 1})
+
+    @event.listens_for(engine, "handle_error")
+    def mysql_error_codes(context):
+        error = context.original_exception
+        if isinstance(error, sqlite3.IntegrityError) and 'UNIQUE' in str(error):
+            error.args = (DUPLICATE_KEY_ERROR_CODE, *error.args)
+        elif isinstance(error, sqlite3.OperationalError) and 'locked' in str(error):
+            error.args = (LOCK_WAIT_TIMEOUT_ERROR_CODE, *error.args)
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            conn.exec_driver_sql(statement)
+
+    manager = DatabaseManager.__new__(DatabaseManager)
+    manager.engine = engine
+    yield manager
+    engine.dispose()
+
+
+def _add_flight(database, seats):
+    departure_time = datetime.now() + timedelta(days=7)
+    with database.engine.begin() as conn:
+        return conn.execute(text("""
+            INSERT INTO flights (flight_number, airline, departure_airport, arrival_airport, departure_time,
+                                 arrival_time, price, available_seats, aircraft_type)
+            VALUES ('AN0100', 'AirlineNexus', 'JFK', 'LAX', :departure_time, :arrival_time, 199, :seats, 'A320')
+        """), {'departure_time': departure_time, 'arrival_time': departure_time + timedelta(hours=6),
+               'seats': seats}).lastrowid
+
+
+def _book(tools, flight_id, passengers):
+    return tools.db_manager.run_in_transaction(
+        lambda conn: tools._book_seats(conn, {flight_id: passengers}),
+        retry_codes=BOOKING_RETRY_CODES
+    )[flight_id]
+
+
+def _seats_and_bookings(database, flight_id):
+    return database.execute_query("""
+        SELECT f.available_seats,
+               (SELECT COUNT(*) FROM bookings b WHERE b.flight_id = f.id AND b.booking_status = 'CONFIRMED')
+        FROM flights f WHERE f.id = :flight_id
+    """, {'flight_id': flight_id})[0]
+
+
+def test_concurrent_bookings_never_oversell(database):
+    seats, threads, attempts = 20, 16, 100
+    flight_id = _add_flight(database, seats)
+    tools = FlightMCPTools()
+    tools.db_manager = database
+
+    references, sold_out, lowest = [], [], [seats]
+    lock = threading.Lock()
+    running = threading.Event()
+    running.set()
+
+    def watch_seats():
+        while running.is_set():
+            lowest.append(_seats_and_bookings(database, flight_id)[0])
+
+    def attempt(n):
+        try:
+            booked = _book(tools, flight_id, [(f"Passenger {n}", f"passenger{n}@example.com")])
+        except SeatsUnavailableError:
+            with lock:
+                sold_out.append(n)
+            return
+        with lock:
+            references.extend(booked)
+
+    watcher = threading.Thread(target=watch_seats)
+    watcher.start()
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(attempt, range(attempts)))
+    finally:
+        running.clear()
+        watcher.join()
+
+    available, confirmed = _seats_and_bookings(database, flight_id)
+    assert len(references) == confirmed == seats
+    assert len(sold_out) == attempts - seats
+    assert len(set(references)) == len(references)
+    assert available == 0
+    assert min(lowest) >= 0
+
+
+def test_group_booking_larger_than_remaining_seats_books_nobody(database):
+    flight_id = _add_flight(database, 2)
+    tools = FlightMCPTools()
+    tools.db_manager = database
+
+    with pytest.raises(SeatsUnavailableError):
+        _book(tools, flight_id, [(f"Passenger {n}", f"passenger{n}@example.com") for n in range(3)])
+
+    assert tuple(_seats_and_bookings(database, flight_id)) == (2, 0)
+
+
+def test_booking_reference_collision_replays_the_transaction(database):
+    flight_id = _add_flight(database, 5)
+    tools = FlightMCPTools()
+    tools.db_manager = database
+    taken = _book(tools, flight_id, [("First Passenger", "first@example.com")])[0]
+
+    # The first attempt draws a reference that is already taken, the replay a fresh one
+    draws = iter([taken, 'FRESH1'])
+    tools._generate_booking_reference = lambda: next(draws)
+    assert _book(tools, flight_id, [("Second Passenger", "second@example.com")]) == ['FRESH1']
+
+    # The failed attempt's seat decrement was rolled back
+    assert tuple(_seats_and_bookings(database, flight_id)) == (3, 2)
@@ -0,0 +1,35 @@
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+
+def latency_summary(samples: List[float]) -> Dict[str, Any]:
+    """p50/p95/p99 and mean of latencies given in seconds, reported in milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'n': 0}
+    percentile = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+    return {
+        'n': len(ordered),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 2)
+    }
+
+
+def measure(fn: Callable[[], Any], runs: int, warmup: int = 0) -> Dict[str, Any]:
+    """Call ``fn`` ``warmup`` times untimed, then ``runs`` times, and summarize the latencies"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for key, value in report.items():
+        print(f"{key}: {value}")
@@ -0,0 +1,53 @@
+import math
+import re
+from collections import Counter
+from typing import Container, Dict, List, Optional, Tuple
+
+# Letters and digits are split apart so "20kg" matches "20 kg"
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+")
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'how', 'i', 'if',
+    'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'the', 'then', 'to', 'what', 'when', 'will', 'with', 'you'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of term -> [(doc, term frequency)] postings"""
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+
+        for doc, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings.setdefault(term, []).append((doc, frequency))
+
+        total = len(self.doc_lengths)
+        self.avg_doc_length = (sum(self.doc_lengths) / total) if total else 0.0
+        self.idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 10, docs: Optional[Container[int]] = None) -> List[Tuple[int, float]]:
+        """Top-k (document position, score) pairs; documents sharing no term, or outside ``docs``, are skipped"""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, frequency in self.postings[term]:
+                if docs is not None and doc not in docs:
+                    continue
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc] / self.avg_doc_length
+                scores[doc] = scores.get(doc, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
@@ -0,0 +1,173 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set
+
+
+def _json_size(value: Any) -> int:
+    """Approximate the memory footprint of a value by its JSON length"""
+    return len(json.dumps(value, default=str))
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'size', 'tags')
+
+    def __init__(self, value: Any, expires_at: Optional[float], size: int, tags: Set[str]):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tags = tags
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL, a memory budget and tag invalidation.
+
+    Entries are evicted least-recently-used first whenever either ``max_entries``
+    or ``max_bytes`` is exceeded. Tags let callers drop every entry derived from
+    some piece of source data (e.g. one flight's seat count) in a single call.
+
+    A value computed from a read that raced with an invalidation must not be
+    stored afterwards: take ``token()`` before reading the source data and pass
+    it to ``set(..., since=token)``, which skips the write if any of its tags
+    was invalidated in the meantime.
+    """
+
+    def __init__(self,
+                 max_entries: int = 1024,
+                 ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None,
+                 size_of: Callable[[Any], int] = _json_size):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        # Invalidation clock: the tick at which each tag was last invalidated. Ticks at or
+        # below _floor are forgotten, so writes whose token predates it are refused.
+        self._clock = 0
+        self._floor = 0
+        self._invalidated_at: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_writes = 0
+
+    def token(self) -> int:
+        """Current invalidation tick, to pass to ``set`` as ``since``"""
+        with self._lock:
+            return self._clock
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = (),
+            since: Optional[int] = None) -> None:
+        size = self.size_of(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        tags = set(tags)
+        with self._lock:
+            if since is not None and (since < self._floor or
+                                      any(self._invalidated_at.get(tag, 0) > since for tag in tags)):
+                self.stale_writes += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            entry = _Entry(value, expires_at, size, tags)
+            self._entries[key] = entry
+            self._bytes += size
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while self._entries and (len(self._entries) > self.max_entries or
+                                     (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry stored with ``tag``; returns how many were removed"""
+        with self._lock:
+            removed = 0
+            for key in list(self._tags.get(tag, ())):
+                if key in self._entries:
+                    self._remove(key)
+                    removed += 1
+            self._tags.pop(tag, None)
+            self._mark_invalidated(tag)
+            self.invalidations += removed
+            return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+            self._clock += 1
+            self._floor = self._clock
+            self._invalidated_at.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'stale_writes': self.stale_writes
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _mark_invalidated(self, tag: str) -> None:
+        self._clock += 1
+        self._invalidated_at[tag] = self._clock
+        if len(self._invalidated_at) > 4 * self.max_entries:
+            # Forget per-tag ticks; only writes that started before now are refused
+            self._floor = self._clock
+            self._invalidated_at.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
@@ -0,0 +1,146 @@
+import os
+import re
+import threading
+from typing import Any, Dict, List
+
+try:
+    import tiktoken
+except ImportError:  # optional: token counts fall back to a characters/4 estimate
+    tiktoken = None
+
+# Structured facts worth keeping for the whole conversation, however long it gets
+SLOT_PATTERNS = {
+    # Six mixed letters and digits, not part of a longer hyphenated ID such as a ticket, an
+    # email address or a domain; a sentence-ending period is fine
+    'booking_references': re.compile(
+        r"(?<![\w@.-])(?=[A-Z0-9]*\d)(?=[A-Z0-9]*[A-Z])[A-Z0-9]{6}(?![\w@-]|\.\w)"),
+    'flight_numbers': re.compile(r"\bAN\d{3,4}\b"),
+    'ticket_ids': re.compile(r"\bANX-\d{8}-[A-F0-9]{6}\b"),
+}
+SLOT_LABELS = {
+    'booking_references': 'Booking references',
+    'flight_numbers': 'Flight numbers',
+    'ticket_ids': 'Support tickets',
+}
+MAX_SLOT_VALUES = 5
+CONTEXT_HEADER = "[Conversation context]"
+MESSAGE_HEADER = "[Current message]"
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text))
+
+
+def current_message(prompt: str) -> str:
+    """The user message from a prompt built by ``ConversationMemory.with_context``"""
+    if not prompt.startswith(CONTEXT_HEADER):
+        return prompt
+    return prompt.split(f"\n\n{MESSAGE_HEADER}\n", 1)[-1]
+
+
+def _first_sentence(text: str, max_chars: int = 160) -> str:
+    sentence = re.split(r"(?<=[.!?])\s|\n", text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars].rstrip() + "..."
+
+
+class ConversationMemory:
+    """Bounded conversation state for one session.
+
+    The most recent turns are kept verbatim while they fit in ``max_tokens``; older
+    turns are folded into a rolling extractive summary capped at ``summary_max_tokens``.
+    Booking references, flight numbers and ticket IDs seen anywhere in the
+    conversation are kept in a small slot store, so the context sent with each turn
+    stays roughly constant in size however long the conversation runs.
+    """
+
+    def __init__(self,
+                 max_tokens: int = int(os.getenv('CONVERSATION_MAX_TOKENS', 1500)),
+                 summary_max_tokens: int = int(os.getenv('CONVERSATION_SUMMARY_MAX_TOKENS', 300))):
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.turns: List[Dict[str, Any]] = []
+        self.summary: List[str] = []
+        self.slots: Dict[str, List[str]] = {name: [] for name in SLOT_PATTERNS}
+        self._lock = threading.Lock()
+
+    def add_turn(self, user: str, assistant: str) -> None:
+        with self._lock:
+            self._extract_slots(user)
+            self._extract_slots(assistant)
+            self.turns.append({'user': user, 'assistant': assistant, 'tokens': count_tokens(user) + count_tokens(assistant)})
+            self._compact()
+
+    def messages(self) -> List[Dict[str, Any]]:
+        """Recent turns as agent messages"""
+        with self._lock:
+            messages = []
+            for turn in self.turns:
+                messages.append({"role": "user", "content": [{"text": turn['user']}]})
+                messages.append({"role": "assistant", "content": [{"text": turn['assistant']}]})
+            return messages
+
+    def context(self) -> str:
+        """Slots and summary as a short text block; empty for a new conversation"""
+        with self._lock:
+            lines = []
+            facts = [f"{SLOT_LABELS[name]}: {', '.join(values)}" for name, values in self.slots.items() if values]
+            if facts:
+                lines.append("Known details: " + "; ".join(facts))
+            if self.summary:
+                lines.append("Earlier in this conversation:")
+                lines.extend(f"- {line}" for line in self.summary)
+            return "\n".join(lines)
+
+    def with_context(self, query: str) -> str:
+        """The user message prefixed with the conversation context, if any"""
+        context = self.context()
+        if not context:
+            return query
+        return f"{CONTEXT_HEADER}\n{context}\n\n{MESSAGE_HEADER}\n{query}"
+
+    def clear(self) -> None:
+        with self._lock:
+            self.turns = []
+            self.summary = []
+            self.slots = {name: [] for name in SLOT_PATTERNS}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'turns': list(self.turns), 'summary': list(self.summary), 'slots': {k: list(v) for k, v in self.slots.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], **kwargs: Any) -> "ConversationMemory":
+        memory = cls(**kwargs)
+        memory.turns = data.get('turns', [])
+        memory.summary = data.get('summary', [])
+        memory.slots.update(data.get('slots', {}))
+        return memory
+
+    def _extract_slots(self, text: str) -> None:
+        for name, pattern in SLOT_PATTERNS.items():
+            values = self.slots[name]
+            for value in pattern.findall(text):
+                # AN1234 has the shape of a booking reference too; it is a flight number
+                if name == 'booking_references' and SLOT_PATTERNS['flight_numbers'].fullmatch(value):
+                    continue
+                # Most recently mentioned last; the oldest value drops out first
+                if value in values:
+                    values.remove(value)
+                values.append(value)
+            del values[:-MAX_SLOT_VALUES]
+
+    def _compact(self) -> None:
+        # Always keep the latest turn verbatim, even if it alone exceeds the budget
+        while len(self.turns) > 1 and sum(turn['tokens'] for turn in self.turns) > self.max_tokens:
+            turn = self.turns.pop(0)
+            self.summary.append(f"User: {_first_sentence(turn['user'])} Assistant: {_first_sentence(turn['assistant'])}")
+        while len(self.summary) > 1 and count_tokens("\n".join(self.summary)) > self.summary_max_tokens:
+            self.summary.pop(0)
+
@@ -1,27 +1,376 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List, Union
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+import hashlib
+import logging
 import os
+import queue
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from utils.cache import TTLCache
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Cache key normalization; all-MiniLM-L6-v2 is uncased so lowercasing is lossless"""
+    return " ".join(text.lower().split())
+
+
+class DiskEmbeddingStore:
+    """Append-only on-disk embedding store backed by a memory-mapped float32 matrix.
+
+    Vectors live in ``embeddings.f32`` (``capacity`` x ``dimension``) and ``keys.txt``
+    holds one ``<row> <key>`` line per vector. Several processes may share a store
+    directory: writers take an exclusive ``flock`` on ``store.lock`` and pick up keys
+    appended by the others before allocating a row. Without fcntl (Windows) a store
+    directory must only be written by one process at a time.
+    """
+
+    def __init__(self, directory: str, dimension: int, capacity: int = 100000):
+        os.makedirs(directory, exist_ok=True)
+        self.dimension = dimension
+        self.capacity = capacity
+        self._keys_path = os.path.join(directory, 'keys.txt')
+        self._lock_path = os.path.join(directory, 'store.lock')
+        self._rows: Dict[str, int] = {}
+        self._next_row = 0
+        self._keys_offset = 0
+        self._lock = threading.Lock()
+        matrix_path = os.path.join(directory, 'embeddings.f32')
+        with self._locked():
+            mode = 'r+' if os.path.exists(matrix_path) else 'w+'
+            self._matrix = np.memmap(matrix_path, dtype=np.float32, mode=mode, shape=(capacity, dimension))
+            self._refresh()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        if row is None:
+            with self._lock:
+                self._refresh()  # another process may have added it
+            row = self._rows.get(key)
+            if row is None:
+                return None
+        return np.array(self._matrix[row])
+
+    def put(self, key: str, embedding: np.ndarray) -> None:
+        with self._locked():
+            self._refresh()
+            if key in self._rows or self._next_row >= self.capacity:
+                return
+            row = self._next_row
+            # Write the vector before publishing its key so a crash never exposes a blank row
+            self._matrix[row] = embedding
+            self._matrix.flush()
+            with open(self._keys_path, 'a') as f:
+                f.write(f"{row} {key}\n")
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Thread lock plus, where available, an exclusive lock shared with other processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Read keys appended since the last call, by this or another process"""
+        if not os.path.exists(self._keys_path) or os.path.getsize(self._keys_path) == self._keys_offset:
+            return
+        with open(self._keys_path, 'rb') as f:
+            f.seek(self._keys_offset)
+            data = f.read()
+        # Only complete lines; a writer may be midway through appending one
+        data = data[:data.rfind(b"\n") + 1]
+        for line in data.decode().splitlines():
+            row, _, key = line.partition(" ")
+            if not key:
+                # Older stores kept bare keys, one per row in order
+                row, key = self._next_row, row
+            self._rows[key] = int(row)
+            self._next_row = max(self._next_row, int(row) + 1)
+        self._keys_offset += len(data)
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text encode requests into batched encode calls.
+
+    The first queued request opens a window of ``max_wait_ms``; everything that arrives
+    within it (up to ``max_batch_size`` texts) is encoded in one call and the results are
+    fanned back out through futures. Identical texts in a window are encoded once.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], max_batch_size: int = 32, max_wait_ms: float = 5):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._worker.start()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            waiting: Dict[str, List[Future]] = {}
+            for text, future in batch:
+                waiting.setdefault(text, []).append(future)
+            texts = list(waiting)
+            try:
+                embeddings = self.encode(texts)
+            except Exception as e:
+                for futures in waiting.values():
+                    for future in futures:
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            for text, embedding in zip(texts, embeddings):
+                for future in waiting[text]:
+                    future.set_result(embedding)
+
 
 class EmbeddingService:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    """Sentence embeddings with a lazily loaded model.
+
+    The SentenceTransformer (and torch/onnxruntime) is imported and loaded on the
+    first embed call, or ahead of time by ``warm_up``. ``backend="onnx"`` runs the
+    ONNX export of the model on CPU; ``onnx_file`` selects a variant such as
+    ``onnx/model_qint8_avx2.onnx`` for the quantized model.
+    """
+
+    def __init__(self,
+                 model_name: str = "all-MiniLM-L6-v2",
+                 cache_size: int = int(os.getenv('EMBEDDING_CACHE_SIZE', 10000)),
+                 cache_dir: Optional[str] = os.getenv('EMBEDDING_CACHE_DIR'),
+                 backend: str = os.getenv('EMBEDDING_BACKEND', 'torch'),
+                 onnx_file: Optional[str] = os.getenv('EMBEDDING_ONNX_FILE'),
+                 batch_max_size: int = int(os.getenv('EMBEDDING_BATCH_MAX_SIZE', 32)),
+                 batch_max_wait_ms: float = float(os.getenv('EMBEDDING_BATCH_MAX_WAIT_MS', 5))):
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._warm_up_thread: Optional[threading.Thread] = None
         self.dimension = 384  # Dimension of all-MiniLM-L6-v2
-    
+        self.cache = TTLCache(max_entries=cache_size)
+        self.disk_cache = DiskEmbeddingStore(os.path.join(cache_dir, self.model_id), self.dimension) if cache_dir else None
+        self.disk_hits = 0
+        # A zero wait window disables micro-batching and encodes on the caller's thread
+        self.batcher = EmbeddingBatcher(self._encode, batch_max_size, batch_max_wait_ms) if batch_max_wait_ms > 0 else None
+
+    @property
+    def model_id(self) -> str:
+        """Model and backend as a path component; vectors from different ones never share a disk cache"""
+        model_id = f"{self.model_name}-{self.backend}"
+        if self.backend == 'onnx' and self.onnx_file:
+            model_id += f"-{self.onnx_file}"
+        return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id)
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def _load_model(self):
+        from sentence_transformers import SentenceTransformer
+
+        if self.backend == 'onnx':
+            model_kwargs = {'file_name': self.onnx_file} if self.onnx_file else None
+            return SentenceTransformer(self.model_name, backend='onnx', model_kwargs=model_kwargs)
+        return SentenceTransformer(self.model_name)
+
+    def warm_up(self, background: bool = True) -> None:
+        """Load the model ahead of the first query, by default on a daemon thread"""
+        if self._model is not None or (self._warm_up_thread is not None and self._warm_up_thread.is_alive()):
+            return
+        if not background:
+            self.model
+            return
+
+        def load():
+            try:
+                self.model
+            except Exception as e:
+                logger.warning(f"Embedding model warm-up failed: {e}")
+
+        self._warm_up_thread = threading.Thread(target=load, name="embedding-warm-up", daemon=True)
+        self._warm_up_thread.start()
+
     def embed_text(self, text: str) -> List[float]:
-        """Generate embedding for a single text"""
-        embedding = self.model.encode(text)
+        """Generate embedding for a single text, served from cache when seen before"""
+        key = hashlib.sha1(normalize_text(text).encode()).hexdigest()
+
+        embedding = self.cache.get(key)
+        if embedding is None and self.disk_cache is not None:
+            embedding = self.disk_cache.get(key)
+            if embedding is not None:
+                self.disk_hits += 1
+                self.cache.set(key, embedding)
+
+        if embedding is None:
+            if self.batcher is not None:
+                embedding = self.batcher.submit(text).result()
+            else:
+                embedding = self._encode([text])[0]
+            self.cache.set(key, embedding)
+            if self.disk_cache is not None:
+                self.disk_cache.put(key, embedding)
+
         return embedding.tolist()
-    
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts), dtype=np.float32)
+
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for multiple texts"""
         embeddings = self.model.encode(texts)
         return embeddings.tolist()
-    
+
     def cosine_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """Calculate cosine similarity between two embeddings"""
         a = np.array(embedding1)
         b = np.array(embedding2)
         return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
-embedding_service = EmbeddingService()
\ No newline at end of file
+    def cache_stats(self) -> Dict[str, Union[int, float]]:
+        """Hit-rate metrics for the query embedding cache"""
+        stats = self.cache.stats()
+        stats['disk_hits'] = self.disk_hits
+        stats['disk_entries'] = len(self.disk_cache) if self.disk_cache is not None else 0
+        lookups = stats['hits'] + stats['misses']
+        stats['effective_hit_rate'] = round((stats['hits'] + self.disk_hits) / lookups, 4) if lookups else 0.0
+        if self.batcher is not None and self.batcher.batches:
+            stats['encode_batches'] = self.batcher.batches
+            stats['mean_batch_size'] = round(self.batcher.texts / self.batcher.batches, 2)
+        return stats
+
+embedding_service = EmbeddingService()
+
+
+# Benchmarks: python -m utils.embeddings startup [runs] | batching [threads] [requests]
+STARTUP_MODULES = ('utils.embeddings', 'multi_agents.policy_agent', 'mcp_server.flight_tools', 'airline_nexus')
+
+
+def _time_in_subprocess(statement: str, env: Dict[str, str]) -> float:
+    """Seconds ``statement`` takes in a fresh interpreter started from the project root"""
+    code = f"import time\n_start = time.perf_counter()\n{statement}\nprint(time.perf_counter() - _start)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', code], cwd=root, env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _startup_summary(statement: str, env: Dict[str, str], runs: int) -> object:
+    from utils.benchmark import latency_summary
+
+    try:
+        return latency_summary([_time_in_subprocess(statement, env) for _ in range(runs)])
+    except subprocess.CalledProcessError as e:
+        return f"unavailable: {e.stderr.strip().splitlines()[-1] if e.stderr.strip() else e}"
+
+
+def startup_benchmark(runs: int = 5) -> Dict[str, object]:
+    """Cold import time of the entry points, and what loading the model eagerly at import would add"""
+    env = dict(os.environ, EMBEDDING_WARMUP='false')
+    report: Dict[str, object] = {'runs': runs}
+    for module in STARTUP_MODULES:
+        report[f'import {module}'] = _startup_summary(f"import {module}", env, runs)
+    statement = "from utils.embeddings import embedding_service\nembedding_service.warm_up(background=False)"
+    for backend in ('torch', 'onnx'):
+        report[f'model load ({backend})'] = _startup_summary(statement, dict(env, EMBEDDING_BACKEND=backend), runs)
+    return report
+
+
+def batching_benchmark(threads: int = 32, requests: int = 2000) -> Dict[str, object]:
+    """Throughput of concurrent uncached embed_text calls from ``threads`` threads, per batch window"""
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.benchmark import latency_summary
+
+    model = EmbeddingService(batch_max_wait_ms=0).model
+    report: Dict[str, object] = {'threads': threads, 'requests': requests}
+    for window_ms in (0, 1, 2, 5, 10, 20):
+        # Texts are unique per window, so every call reaches the encoder
+        service = EmbeddingService(cache_size=0, cache_dir=None, batch_max_wait_ms=window_ms)
+        service._model = model
+        latencies: List[float] = []
+
+        def call(n: int) -> None:
+            start = time.perf_counter()
+            service.embed_text(f"baggage allowance question {window_ms}-{n}")
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(call, range(requests)))
+        elapsed = time.perf_counter() - start
+        stats = service.cache_stats()
+        report[f'window {window_ms}ms'] = {
+            'texts_per_s': round(requests / elapsed, 1),
+            'mean_batch_size': stats.get('mean_batch_size', 1.0),
+            **latency_summary(latencies)
+        }
+    return report
+
+
+if __name__ == "__main__":
+    from utils.benchmark import print_report
+
+    benchmarks = {'startup': startup_benchmark, 'batching': batching_benchmark}
+    if len(sys.argv) < 2 or sys.argv[1] not in benchmarks:
+        print(f"Usage: python -m utils.embeddings {{{'|'.join(benchmarks)}}} [args...]")
+        sys.exit(1)
+    print_report(benchmarks[sys.argv[1]](*(int(arg) for arg in sys.argv[2:])))
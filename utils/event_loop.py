@@ -0,0 +1,61 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Coroutine, Optional
+
+
+class BackgroundLoop:
+    """An asyncio event loop running forever on a daemon thread.
+
+    Async resources bound to a loop (such as pooled httpx connections) can be
+    shared by every caller thread as long as all of their work is submitted here.
+    Caller context variables are carried into the submitted coroutine.
+
+    Blocking work the loop hands off (``asyncio.to_thread``, sync strands tools, DNS
+    lookups) runs on an executor of ``max_workers`` threads rather than asyncio's
+    default of min(32, cpu + 4), which concurrent agent turns can exhaust.
+    """
+
+    def __init__(self, name: str, max_workers: int = 64):
+        self.name = name
+        self.max_workers = max_workers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    loop.set_default_executor(
+                        ThreadPoolExecutor(self.max_workers, thread_name_prefix=f"{self.name}-worker")
+                    )
+                    self._thread = threading.Thread(target=loop.run_forever, name=self.name, daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def is_current(self) -> bool:
+        """True when called from a coroutine running on this loop"""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block the calling thread for its result"""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError(f"{self.name}.run() called from its own loop thread; await the coroutine instead")
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+
+agent_loop = BackgroundLoop("agent-loop", max_workers=int(os.getenv('AGENT_LOOP_WORKERS', 64)))
@@ -0,0 +1,160 @@
+import asyncio
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.streaming import EventChannel, TERMINAL_EVENTS, current_channel
+
+
+class JobQueueFullError(Exception):
+    """Raised when every worker is busy and the wait queue is at its limit"""
+
+
+class Job(EventChannel):
+    """Handle to one request running on a JobRunner.
+
+    Events are kept for the job's lifetime, so any number of readers can replay
+    them from a cursor, e.g. a UI that reconnects after a page rerun. Threads wait
+    with ``wait_events``; coroutines use ``await_events``, which is woken through
+    their own event loop and holds no executor thread while it waits.
+    """
+
+    def __init__(self, query: str):
+        self.id = uuid.uuid4().hex
+        self.query = query
+        self.status = 'queued'
+        self.events: List[Dict[str, Any]] = []
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._changed = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def emit(self, event_type: str, **fields: Any) -> None:
+        with self._changed:
+            self.events.append({'type': event_type, **fields})
+            self._changed.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, ready in waiters:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass  # the waiter's loop has shut down
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'error')
+
+    def wait_events(self, cursor: int = 0, timeout: Optional[float] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Events after ``cursor``, waiting up to ``timeout`` for new ones; returns them and the new cursor"""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > cursor, timeout)
+            events = self.events[cursor:]
+            return events, cursor + len(events)
+
+    async def await_events(self, cursor: int = 0, timeout: Optional[float] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """``wait_events`` for coroutines"""
+        ready = asyncio.Event()
+        with self._changed:
+            if len(self.events) <= cursor:
+                self._async_waiters.append((asyncio.get_running_loop(), ready))
+        if len(self.events) <= cursor:
+            try:
+                await asyncio.wait_for(ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._changed:
+                    self._async_waiters = [w for w in self._async_waiters if w[1] is not ready]
+        with self._changed:
+            events = self.events[cursor:]
+            return events, cursor + len(events)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        cursor = 0
+        while True:
+            events, cursor = self.wait_events(cursor)
+            for event in events:
+                yield event
+                if event['type'] in TERMINAL_EVENTS:
+                    return
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        cursor = 0
+        while True:
+            events, cursor = await self.await_events(cursor)
+            for event in events:
+                yield event
+                if event['type'] in TERMINAL_EVENTS:
+                    return
+
+
+class JobRunner:
+    """Shared worker pool that runs agent requests off the caller's thread.
+
+    At most ``max_workers`` requests run at once and up to ``max_queue`` more wait
+    their turn; beyond that ``submit`` raises JobQueueFullError so callers can shed
+    load instead of piling up. ``handler`` runs with the job as the current event
+    channel, so streamed agent events land on the job.
+    """
+
+    def __init__(self, handler: Callable[..., str], max_workers: int = 8, max_queue: int = 32):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-job")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, query: str, **kwargs: Any) -> Job:
+        """Queue ``handler(query, **kwargs)``; raises JobQueueFullError when the queue is full"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise JobQueueFullError(f"{self._pending} requests already in progress")
+            self._pending += 1
+        job = Job(query)
+        # A fresh context per job; pool threads are reused and must not leak a previous job's channel
+        self._executor.submit(contextvars.Context().run, self._run, job, kwargs)
+        return job
+
+    def _run(self, job: Job, kwargs: Dict[str, Any]) -> None:
+        current_channel.set(job)
+        with self._lock:
+            self.running += 1
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = self.handler(job.query, **kwargs)
+            job.status = 'done'
+            job.emit('done', content=job.result)
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'error'
+            job.emit('error', message=job.error)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self.running -= 1
+                self._pending -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'running': self.running,
+                'queued': self._pending - self.running,
+                'completed': self.completed,
+                'rejected': self.rejected
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,242 @@
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from mcp.client.streamable_http import streamablehttp_client
+from strands.tools.mcp.mcp_client import MCPClient
+
+from utils.benchmark import measure, print_report
+from utils.prompts import compact_description
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# strands turns exceptions raised while calling an MCP tool (transport or session failures) into
+# error tool results with this prefix; errors reported by the tool itself come back without it
+CLIENT_ERROR_PREFIX = "Tool execution failed:"
+
+# Tool descriptions are sent with every flight agent call; the Returns sections and docstring layout add nothing
+COMPACT_TOOL_SCHEMAS = os.getenv('MCP_COMPACT_TOOL_SCHEMAS', 'true').lower() == 'true'
+
+
+class _PooledSession:
+    """A single long-lived streamable-HTTP MCP session with its cached tool list"""
+
+    def __init__(self, server_url: str, max_concurrency: int):
+        self.server_url = server_url
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.client: Optional[MCPClient] = None
+        self.tools: List = []
+        self.fingerprint: Optional[str] = None
+        self.last_checked = 0.0
+        self.healthy = False
+        self.lock = threading.Lock()
+
+    def open(self) -> None:
+        """Connect, run the MCP initialize handshake and cache the tool list"""
+        client = MCPClient(lambda: streamablehttp_client(self.server_url))
+        client.start()
+        self.client = client
+        self.refresh_tools()
+
+    def close(self) -> None:
+        client, self.client = self.client, None
+        self.healthy = False
+        self.tools = []
+        if client is not None:
+            try:
+                client.stop(None, None, None)
+            except Exception as e:
+                logger.warning(f"Error closing MCP session: {e}")
+
+    def refresh_tools(self) -> bool:
+        """Re-list tools; returns True when the server's tool set changed"""
+        tools = list(self.client.list_tools_sync())
+        fingerprint = _tools_fingerprint(tools)
+        changed = fingerprint != self.fingerprint
+        if COMPACT_TOOL_SCHEMAS:
+            for tool in tools:
+                if tool.mcp_tool.description:
+                    tool.mcp_tool.description = compact_description(tool.mcp_tool.description)
+        self.tools = tools
+        self.fingerprint = fingerprint
+        self.last_checked = time.monotonic()
+        self.healthy = True
+        return changed
+
+
+def _tools_fingerprint(tools: List) -> str:
+    """Hash tool names, descriptions and schemas so server upgrades are detected"""
+    specs = sorted(
+        (tool.mcp_tool.name, tool.mcp_tool.description or "", json.dumps(tool.mcp_tool.inputSchema, sort_keys=True))
+        for tool in tools
+    )
+    return hashlib.sha256(json.dumps(specs).encode()).hexdigest()
+
+
+def _has_client_errors(messages: List[Dict[str, Any]]) -> bool:
+    for message in messages:
+        for block in message.get('content', []):
+            result = block.get('toolResult')
+            if result and result.get('status') == 'error' and any(
+                    part.get('text', '').startswith(CLIENT_ERROR_PREFIX) for part in result.get('content', [])):
+                return True
+    return False
+
+
+class MCPSessionManager:
+    """Process-wide pool of warm MCP sessions to the flight MCP server.
+
+    Sessions are opened lazily, kept alive between queries and health-checked by
+    re-listing tools every ``health_check_interval`` seconds. A failed query forces
+    a health check on the next lease, which reconnects if the session is dead.
+    """
+
+    def __init__(self,
+                 server_url: Optional[str] = None,
+                 pool_size: int = int(os.getenv('MCP_POOL_SIZE', 2)),
+                 max_concurrency_per_session: int = int(os.getenv('MCP_SESSION_MAX_CONCURRENCY', 4)),
+                 health_check_interval: float = float(os.getenv('MCP_HEALTH_CHECK_INTERVAL', 60)),
+                 acquire_timeout: float = float(os.getenv('MCP_ACQUIRE_TIMEOUT', 30))):
+        self.server_url = server_url or os.getenv('MCP_SERVER_URL')
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._sessions = [_PooledSession(self.server_url, max_concurrency_per_session) for _ in range(pool_size)]
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self) -> Iterator[Tuple[MCPClient, List]]:
+        """Lease a healthy session; yields the MCP client and its cached tools"""
+        pooled = self._acquire()
+        try:
+            self._ensure_ready(pooled)
+            yield pooled.client, pooled.tools
+        except Exception:
+            # The server may have restarted or the connection dropped; health-check on next lease
+            pooled.last_checked = 0.0
+            raise
+        finally:
+            pooled.slots.release()
+
+    @asynccontextmanager
+    async def asession(self) -> AsyncIterator[Tuple[MCPClient, List]]:
+        """``session()`` for coroutines; waiting for a slot and (re)connecting run off the event loop"""
+        pooled = await asyncio.to_thread(self._acquire)
+        try:
+            await asyncio.to_thread(self._ensure_ready, pooled)
+            yield pooled.client, pooled.tools
+        except Exception:
+            pooled.last_checked = 0.0
+            raise
+        finally:
+            pooled.slots.release()
+
+    def warm_up(self) -> None:
+        """Open every session in the pool ahead of the first query"""
+        for pooled in self._sessions:
+            try:
+                with pooled.lock:
+                    if pooled.client is None:
+                        pooled.open()
+            except Exception as e:
+                logger.warning(f"MCP warm-up failed: {e}")
+
+    def check_results(self, client: MCPClient, messages: List[Dict[str, Any]]) -> None:
+        """Reconnect ``client``'s session on its next lease if a tool call in ``messages`` failed in transport.
+
+        Tool call exceptions never reach ``session()``: strands returns them to the agent as
+        error results, so the caller passes the agent's messages here after each run.
+        """
+        if not _has_client_errors(messages):
+            return
+        for pooled in self._sessions:
+            if pooled.client is client:
+                logger.warning("MCP tool call failed on the client side; reconnecting on next lease")
+                pooled.healthy = False
+
+    def invalidate_tools(self) -> None:
+        """Force every session to re-list tools on its next lease"""
+        for pooled in self._sessions:
+            pooled.last_checked = 0.0
+
+    def close(self) -> None:
+        for pooled in self._sessions:
+            with pooled.lock:
+                pooled.close()
+
+    def _acquire(self) -> _PooledSession:
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._lock:
+                start = self._next
+                self._next = (self._next + 1) % len(self._sessions)
+            # Round-robin over sessions, taking the first one with a free slot
+            for i in range(len(self._sessions)):
+                pooled = self._sessions[(start + i) % len(self._sessions)]
+                if pooled.slots.acquire(blocking=False):
+                    return pooled
+            if time.monotonic() >= deadline:
+                raise TimeoutError("Timed out waiting for a free MCP session")
+            time.sleep(0.01)
+
+    def _ensure_ready(self, pooled: _PooledSession) -> None:
+        with pooled.lock:
+            if pooled.client is None or not pooled.healthy:
+                pooled.close()
+                pooled.open()
+                return
+
+            if time.monotonic() - pooled.last_checked >= self.health_check_interval:
+                try:
+                    if pooled.refresh_tools():
+                        logger.info("MCP tool list changed; refreshing cached tools on all sessions")
+                        self.invalidate_tools()
+                        pooled.last_checked = time.monotonic()
+                except Exception as e:
+                    logger.warning(f"MCP health check failed, reconnecting: {e}")
+                    pooled.close()
+                    pooled.open()
+
+
+mcp_session_manager = MCPSessionManager()
+atexit.register(mcp_session_manager.close)
+
+
+def benchmark(queries: int = 20) -> Dict[str, Any]:
+    """Per-query MCP overhead: a new session per query (the old flight_agent behaviour) vs a pooled lease.
+
+    Each query lists tools and runs one small search, as a flight_agent turn does. Needs the MCP
+    server running at MCP_SERVER_URL.
+    """
+    arguments = {'limit': 1}
+
+    def fresh_session() -> None:
+        client = MCPClient(lambda: streamablehttp_client(mcp_session_manager.server_url))
+        with client:
+            client.list_tools_sync()
+            client.call_tool_sync(uuid.uuid4().hex, 'search_flights', arguments)
+
+    def pooled_session() -> None:
+        with mcp_session_manager.session() as (client, tools):
+            client.call_tool_sync(uuid.uuid4().hex, 'search_flights', arguments)
+
+    return {
+        'queries': queries,
+        'new_session_per_query': measure(fresh_session, queries, warmup=1),
+        'pooled_session': measure(pooled_session, queries, warmup=1)
+    }
+
+
+if __name__ == "__main__":
+    print_report(benchmark())
@@ -0,0 +1,77 @@
+import os
+import re
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from prompts.coordinator_prompt import COORDINATOR_SYSTEM_PROMPT, COORDINATOR_SYSTEM_PROMPT_COMPACT
+from prompts.flight_prompt import FLIGHT_SYSTEM_PROMPT, FLIGHT_SYSTEM_PROMPT_COMPACT
+from prompts.policy_prompt import POLICY_SYSTEM_PROMPT, POLICY_SYSTEM_PROMPT_COMPACT
+from utils.conversation import count_tokens
+
+load_dotenv()
+
+# (full, compact) system prompt per agent
+PROMPTS: Dict[str, Tuple[str, str]] = {
+    'coordinator': (COORDINATOR_SYSTEM_PROMPT, COORDINATOR_SYSTEM_PROMPT_COMPACT),
+    'flight': (FLIGHT_SYSTEM_PROMPT, FLIGHT_SYSTEM_PROMPT_COMPACT),
+    'policy': (POLICY_SYSTEM_PROMPT, POLICY_SYSTEM_PROMPT_COMPACT),
+}
+VARIANTS = ('full', 'compact')
+
+
+def compact_description(description: str) -> str:
+    """Tool docstring without its Returns section, blank lines and indentation"""
+    description = re.split(r"\n\s*Returns:", description, maxsplit=1)[0]
+    lines = (line.strip() for line in description.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class PromptManager:
+    """System prompts per agent, their token cost and the tokens actually billed.
+
+    ``variant`` selects the full markdown prompts or their compact rewrites; both
+    carry the same instructions. Token usage reported by the model is aggregated
+    per agent so the effect of prompt changes shows up in ``usage_stats``.
+    """
+
+    def __init__(self, variant: str = os.getenv('PROMPT_VARIANT', 'compact')):
+        if variant not in VARIANTS:
+            print(f"Unknown PROMPT_VARIANT '{variant}', using compact prompts")
+            variant = 'compact'
+        self.variant = variant
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def system_prompt(self, agent: str, variant: Optional[str] = None) -> str:
+        full, compact = PROMPTS[agent]
+        return compact if (variant or self.variant) == 'compact' else full
+
+    def token_report(self) -> Dict[str, Dict[str, int]]:
+        """Token count of each agent's full and compact system prompt"""
+        return {
+            agent: {variant: count_tokens(self.system_prompt(agent, variant)) for variant in VARIANTS}
+            for agent in PROMPTS
+        }
+
+    def record_usage(self, agent: str, usage: Dict[str, Any]) -> None:
+        with self._lock:
+            totals = self._usage.setdefault(agent, {'calls': 0, 'input_tokens': 0, 'output_tokens': 0})
+            totals['calls'] += 1
+            totals['input_tokens'] += usage.get('inputTokens', 0)
+            totals['output_tokens'] += usage.get('outputTokens', 0)
+
+    def usage_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {agent: dict(totals) for agent, totals in self._usage.items()}
+
+
+prompt_manager = PromptManager()
+
+
+if __name__ == "__main__":
+    print(f"{'agent':<12} {'full':>6} {'compact':>8} {'saved':>6}")
+    for agent, counts in prompt_manager.token_report().items():
+        saved = 1 - counts['compact'] / counts['full']
+        print(f"{agent:<12} {counts['full']:>6} {counts['compact']:>8} {saved:>6.0%}")
@@ -0,0 +1,129 @@
+import re
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Quantities, with the unit spelled however the user wrote it: "20kg", "20 kilos", "$35", "3 hrs"
+QUANTITY_PATTERN = re.compile(
+    r"([$€£])\s*(\d+(?:[.,]\d+)?)|(\d+(?:[.,]\d+)?)\s*(kgs?|kilos?|kilograms?|lbs?|pounds?|cm|mm|inch(?:es)?|in|"
+    r"ml|l|liters?|litres?|wh|hours?|hrs?|h|minutes?|mins?|days?|weeks?|months?|years?|yrs?|%)?(?![a-z])",
+    re.IGNORECASE
+)
+UNIT_ALIASES = {
+    'kgs': 'kg', 'kilo': 'kg', 'kilos': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb', 'inch': 'in', 'inches': 'in',
+    'liter': 'l', 'liters': 'l', 'litre': 'l', 'litres': 'l',
+    'hour': 'h', 'hours': 'h', 'hr': 'h', 'hrs': 'h', 'minute': 'min', 'minutes': 'min', 'mins': 'min',
+    'days': 'day', 'weeks': 'week', 'months': 'month', 'years': 'year', 'yr': 'year', 'yrs': 'year'
+}
+
+
+def quantity_tokens(text: str) -> FrozenSet[str]:
+    """Normalized numbers and their units, e.g. {"20kg", "$35"}; embeddings barely tell them apart"""
+    tokens = set()
+    for currency, amount, number, unit in QUANTITY_PATTERN.findall(text):
+        if currency:
+            tokens.add(currency + amount.replace(',', ''))
+        else:
+            unit = unit.lower()
+            tokens.add(number.replace(',', '') + UNIT_ALIASES.get(unit, unit))
+    return frozenset(tokens)
+
+
+class SemanticCache:
+    """Answer cache keyed by query embedding rather than exact query text.
+
+    A stored answer is served to a later query when their embeddings have cosine
+    similarity of at least ``radius``, retrieval returned exactly the same documents
+    and both carry the same ``entities`` (quantities, names and other details the
+    embedding blurs: "20kg bag" and "40kg bag" are near neighbours). Every entry
+    belongs to one corpus ``version``; a lookup or store with a different version
+    drops the whole cache, so re-ingested documents never serve stale answers.
+    ``ttl`` bounds staleness when no version is available. Entries live in a
+    fixed-size ring buffer, overwriting the oldest first.
+    """
+
+    def __init__(self, radius: float = 0.92, max_entries: int = 2048, ttl: Optional[float] = None):
+        self.radius = radius
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version: Optional[Hashable] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._entries: List[Optional[Tuple[Tuple[str, ...], FrozenSet[str], Any, Optional[float]]]] = [None] * max_entries
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, embedding: Sequence[float], doc_ids: Sequence[str], version: Optional[Hashable] = None,
+               entities: Iterable[str] = ()) -> Optional[Any]:
+        query = self._normalize(embedding)
+        doc_ids = tuple(doc_ids)
+        entities = frozenset(entities)
+        with self._lock:
+            self._check_version(version)
+            if self._size:
+                similarities = self._matrix[:self._size] @ query
+                now = time.monotonic()
+                matches = np.flatnonzero(similarities >= self.radius)
+                for row in matches[np.argsort(-similarities[matches])]:
+                    entry_ids, entry_entities, answer, expires_at = self._entries[row]
+                    if expires_at is not None and expires_at <= now:
+                        continue
+                    if entry_ids == doc_ids and entry_entities == entities:
+                        self.hits += 1
+                        return answer
+            self.misses += 1
+            return None
+
+    def store(self, embedding: Sequence[float], doc_ids: Sequence[str], answer: Any, version: Optional[Hashable] = None,
+              entities: Iterable[str] = ()) -> None:
+        vector = self._normalize(embedding)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._check_version(version)
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            row = self._next
+            self._matrix[row] = vector
+            self._entries[row] = (tuple(doc_ids), frozenset(entities), answer, expires_at)
+            self._next = (row + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self.invalidations
+            }
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _check_version(self, version: Optional[Hashable]) -> None:
+        if version != self.version:
+            self._clear()
+            self.version = version
+
+    def _clear(self) -> None:
+        self.invalidations += self._size
+        self._entries = [None] * self.max_entries
+        self._size = 0
+        self._next = 0
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
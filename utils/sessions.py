@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from utils.conversation import ConversationMemory
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+load_dotenv()
+
+
+class Session:
+    """One user's conversation: bounded agent memory plus the visible transcript"""
+
+    def __init__(self, session_id: str, max_transcript: int = 100):
+        self.id = session_id
+        self.created_at = time.time()
+        self.last_active = self.created_at
+        self.memory = ConversationMemory()
+        self.transcript: List[Dict[str, Any]] = []
+        self.max_transcript = max_transcript
+        # Turns of one session are answered one at a time, in order
+        self.lock = threading.Lock()
+        self.size = 0
+        # Turns saved so far; the store keeps the same count to spot changes by other workers
+        self.version = 0
+
+    def record(self, user: str, assistant: str) -> None:
+        now = time.time()
+        self.transcript.append({'role': 'user', 'content': user, 'timestamp': now})
+        self.transcript.append({'role': 'assistant', 'content': assistant, 'timestamp': now})
+        del self.transcript[:-self.max_transcript]
+        self.last_active = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'session_id': self.id,
+            'created_at': self.created_at,
+            'last_active': self.last_active,
+            'messages': self.transcript,
+            'memory': self.memory.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_transcript: int = 100) -> "Session":
+        session = cls(data['session_id'], max_transcript)
+        session.created_at = data['created_at']
+        session.last_active = data['last_active']
+        session.transcript = data.get('messages', [])
+        session.memory = ConversationMemory.from_dict(data.get('memory', {}))
+        return session
+
+    def restore(self, data: Dict[str, Any], version: int) -> None:
+        """Replace this session's state with a stored copy; the caller holds ``lock``"""
+        stored = Session.from_dict(data, self.max_transcript)
+        self.created_at = stored.created_at
+        self.last_active = max(self.last_active, stored.last_active)
+        self.transcript = stored.transcript
+        self.memory = stored.memory
+        self.version = version
+
+
+class _SessionStore:
+    """SQLite table of serialized sessions, shared by every worker process using the same path.
+
+    Each row carries the session's version, so a worker can tell when its live copy is
+    stale. ``locked`` holds a per-session lock file, serializing turns across processes;
+    without fcntl (Windows) only one process may serve a given session at a time.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock_dir = f"{path}.locks"
+        os.makedirs(self._lock_dir, exist_ok=True)
+        # Other workers write the same file; wait for their transactions rather than failing
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL, "
+                "version INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+            if 'version' not in columns:
+                self._conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def load(self, session_id: str) -> Optional[Tuple[str, int]]:
+        """Serialized session and its version"""
+        with self._lock:
+            row = self._conn.execute("SELECT data, version FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def save(self, session_id: str, data: str, version: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (id, data, updated_at, version) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at, "
+                "version = excluded.version",
+                (session_id, data, time.time(), version)
+            )
+
+    @contextmanager
+    def locked(self, session_id: str) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        # Hashed, since session ids come from clients
+        name = hashlib.sha1(session_id.encode()).hexdigest()
+        with open(os.path.join(self._lock_dir, f"{name}.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Marks the lock file as in use for purge
+                os.utime(lock_file.fileno())
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def purge(self, older_than: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (older_than,))
+        for entry in os.scandir(self._lock_dir):
+            if entry.stat().st_mtime < older_than:
+                os.unlink(entry.path)
+
+
+class SessionManager:
+    """Process-wide LRU of live sessions.
+
+    Sessions idle for ``idle_timeout`` seconds are evicted, as are the least recently
+    used ones once there are more than ``max_sessions`` or their serialized size
+    exceeds ``max_bytes``. With ``store_path`` set, the store is the source of truth:
+    turns run under a lock shared with other worker processes, start from the stored
+    copy when another worker has moved it on, and are written back when they finish.
+    Stored sessions expire after ``store_ttl`` seconds. Without a store, sessions only
+    exist in the process that created them.
+    """
+
+    def __init__(self,
+                 max_sessions: int = int(os.getenv('SESSION_MAX_SESSIONS', 1000)),
+                 idle_timeout: float = float(os.getenv('SESSION_IDLE_TIMEOUT', 3600)),
+                 max_bytes: int = int(float(os.getenv('SESSION_MAX_MEMORY_MB', 256)) * 1024 * 1024),
+                 store_path: Optional[str] = os.getenv('SESSION_STORE_PATH'),
+                 store_ttl: float = float(os.getenv('SESSION_STORE_TTL', 7 * 24 * 3600))):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_bytes
+        self.store_ttl = store_ttl
+        self.store = _SessionStore(store_path) if store_path else None
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        if self.store is not None:
+            self.store.purge(time.time() - store_ttl)
+
+    def create(self) -> Session:
+        session = self.get(uuid.uuid4().hex)
+        # Stored straight away, so every worker knows the new id
+        self.save(session)
+        return session
+
+    def get(self, session_id: str, create: bool = True) -> Optional[Session]:
+        """Live session, brought up to date with the store; None if unknown and ``create`` is False"""
+        stored = self.store.load(session_id) if self.store is not None else None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and self.store is not None and stored is None and session.version > 0:
+                # Deleted, or expired from the store, by another worker
+                self._bytes -= self._sessions.pop(session_id).size
+                session = None
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_active = time.time()
+            elif stored is not None or create:
+                session = Session(session_id)
+                self._sessions[session_id] = session
+                self._evict()
+            else:
+                return None
+
+        # A turn running here holds the lock and reloads the session itself
+        if stored is not None and session.lock.acquire(blocking=False):
+            try:
+                self._restore(session, stored)
+            finally:
+                session.lock.release()
+        return session
+
+    @contextmanager
+    def turn(self, session: Session) -> Iterator[Session]:
+        """Hold ``session`` for one turn, in order with its other turns in any worker process"""
+        with session.lock:
+            if self.store is None:
+                yield session
+                return
+            with self.store.locked(session.id):
+                stored = self.store.load(session.id)
+                if stored is not None:
+                    self._restore(session, stored)
+                yield session
+
+    def save(self, session: Session) -> None:
+        """Account for the session's new size and persist it after a turn, inside ``turn``"""
+        session.version += 1
+        data = json.dumps(session.to_dict(), default=str)
+        self._resize(session, len(data))
+        if self.store is not None:
+            self.store.save(session.id, data, session.version)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._bytes -= session.size
+        if self.store is not None:
+            existed = self.store.load(session_id) is not None
+            self.store.delete(session_id)
+            return session is not None or existed
+        return session is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self._bytes,
+                'evictions': self.evictions,
+                'persistent': self.store is not None
+            }
+
+    def _restore(self, session: Session, stored: Tuple[str, int]) -> None:
+        """Adopt the stored copy if another worker saved a newer one; the caller holds the session's lock"""
+        data, version = stored
+        if version > session.version:
+            session.restore(json.loads(data), version)
+            self._resize(session, len(data))
+
+    def _resize(self, session: Session, size: int) -> None:
+        with self._lock:
+            if session.id in self._sessions:
+                self._bytes += size - session.size
+                session.size = size
+                self._evict()
+
+    def _evict(self) -> None:
+        now = time.time()
+        while self._sessions:
+            session_id, oldest = next(iter(self._sessions.items()))
+            over_limit = len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            if not over_limit and now - oldest.last_active < self.idle_timeout:
+                break
+            # Never drop the session that was just touched
+            if len(self._sessions) == 1:
+                break
+            del self._sessions[session_id]
+            self._bytes -= oldest.size
+            self.evictions += 1
+
+
+session_manager = SessionManager()
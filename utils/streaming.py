@@ -0,0 +1,70 @@
+import asyncio
+import contextvars
+import queue
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+# Terminal event types; a channel yields nothing after one of them
+TERMINAL_EVENTS = ('done', 'error')
+
+
+class EventChannel:
+    """Ordered hand-off of agent events from worker threads to one consumer.
+
+    Events are plain dicts with a ``type`` key: ``agent_start``/``agent_end`` and
+    ``tool`` carry the agent name, ``token`` carries streamed text, and the final
+    ``done`` (with ``content``) or ``error`` (with ``message``) ends the stream.
+    With ``loop`` set, events are delivered to an async consumer on that loop.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop
+        self._queue: Any = asyncio.Queue() if loop is not None else queue.Queue()
+
+    def emit(self, event_type: str, **fields: Any) -> None:
+        event = {'type': event_type, **fields}
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+        else:
+            self._queue.put(event)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            event = self._queue.get()
+            yield event
+            if event['type'] in TERMINAL_EVENTS:
+                return
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            event = await self._queue.get()
+            yield event
+            if event['type'] in TERMINAL_EVENTS:
+                return
+
+
+# Channel of the request being served; agents are shared, so they look it up per event
+current_channel: contextvars.ContextVar[Optional[EventChannel]] = contextvars.ContextVar('current_channel', default=None)
+
+
+def emit(event_type: str, **fields: Any) -> None:
+    """Send an event to the current request's channel, if it is being streamed"""
+    channel = current_channel.get()
+    if channel is not None:
+        channel.emit(event_type, **fields)
+
+
+def streaming_callback(agent_name: str) -> Callable[..., None]:
+    """Agent callback handler forwarding text tokens and tool calls to the current channel"""
+
+    def handler(**kwargs: Any) -> None:
+        channel = current_channel.get()
+        if channel is None:
+            return
+        data = kwargs.get('data')
+        if data:
+            channel.emit('token', agent=agent_name, data=data)
+        tool_use = kwargs.get('event', {}).get('contentBlockStart', {}).get('start', {}).get('toolUse')
+        if tool_use:
+            channel.emit('tool', agent=agent_name, tool=tool_use['name'])
+
+    return handler
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.bm25 import BM25Index
+
+logger = logging.getLogger(__name__)
+
+try:
+    import hnswlib
+except ImportError:  # optional: brute force is used for every corpus size
+    hnswlib = None
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+class LocalVectorIndex:
+    """In-process cosine top-k search over normalized float32 embeddings.
+
+    Small corpora are searched exactly with one matrix-vector product. From
+    ``hnsw_threshold`` rows on, an HNSW graph is built when hnswlib is installed.
+    Distances are cosine distances (1 - similarity), matching TiDB's vector search.
+    A BM25 index over title, category and content is built alongside for lexical search.
+
+    Rows are kept grouped by category, so a category filter searches one contiguous
+    slice of the matrix (a view, not a copy) instead of the whole corpus.
+    """
+
+    def __init__(self,
+                 ids: List[str],
+                 documents: List[str],
+                 metadatas: List[Dict[str, Any]],
+                 embeddings: np.ndarray,
+                 normalized: bool = False,
+                 hnsw_threshold: int = int(os.getenv('POLICY_INDEX_HNSW_THRESHOLD', 50000))):
+        # Already-normalized matrices (e.g. a memory-mapped snapshot) are used as-is
+        matrix = embeddings if normalized else _normalize_rows(
+            np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        )
+        categories = [metadata.get('category', '') for metadata in metadatas]
+        order = sorted(range(len(ids)), key=lambda row: categories[row])
+        if order != list(range(len(ids))):
+            ids = [ids[row] for row in order]
+            documents = [documents[row] for row in order]
+            metadatas = [metadatas[row] for row in order]
+            categories = [categories[row] for row in order]
+            matrix = np.ascontiguousarray(matrix[order])
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.matrix = matrix
+
+        self.partitions: Dict[str, range] = {}
+        for row, category in enumerate(categories):
+            start = self.partitions[category].start if category in self.partitions else row
+            self.partitions[category] = range(start, row + 1)
+
+        self.hnsw_threshold = hnsw_threshold
+        self._hnsw = None
+        if hnswlib is not None and len(ids) >= hnsw_threshold:
+            self._hnsw = hnswlib.Index(space='cosine', dim=self.matrix.shape[1])
+            self._hnsw.init_index(max_elements=len(ids), ef_construction=200, M=16)
+            self._hnsw.add_items(self.matrix, np.arange(len(ids)))
+            self._hnsw.set_ef(64)
+        self.lexical = BM25Index([
+            f"{metadata.get('title', '')} {metadata.get('category', '')} {document}"
+            for document, metadata in zip(documents, metadatas)
+        ])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _rows(self, category: Optional[str]) -> range:
+        if category is None:
+            return range(len(self.ids))
+        return self.partitions.get(category, range(0))
+
+    def search(self, query_embedding: List[float], k: int = 3, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = self._rows(category)
+        if not rows:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        k = min(k, len(rows))
+
+        if self._hnsw is not None and len(rows) >= self.hnsw_threshold:
+            kwargs = {'filter': lambda label: label in rows} if category is not None else {}
+            labels, distances = self._hnsw.knn_query(query, k=k, **kwargs)
+            top, top_distances = labels[0], distances[0]
+        else:
+            similarities = self.matrix[rows.start:rows.stop] @ query
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top])]
+            top_distances = 1.0 - similarities[top]
+            top = top + rows.start
+
+        return [
+            {
+                'id': self.ids[row],
+                'document': self.documents[row],
+                'metadata': self.metadatas[row],
+                'distance': float(distance)
+            }
+            for row, distance in zip(top, top_distances)
+        ]
+
+    def lexical_search(self, query: str, k: int = 3, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        docs = self._rows(category) if category is not None else None
+        return [
+            {
+                'id': self.ids[row],
+                'document': self.documents[row],
+                'metadata': self.metadatas[row],
+                'score': score
+            }
+            for row, score in self.lexical.search(query, k, docs=docs)
+        ]
+
+
+def _parse_vector(value: Any) -> List[float]:
+    """TiDB returns VECTOR columns as their '[x,y,...]' text form"""
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode()
+    return json.loads(value) if isinstance(value, str) else list(value)
+
+
+class PolicyIndexMirror:
+    """Keeps a LocalVectorIndex in sync with a TiDB vector table.
+
+    TiDB stays the source of truth. Every ``sync_interval`` seconds one caller
+    checks a cheap watermark (row count and latest update_time) and reloads the
+    table only when it moved; other callers keep using the current index meanwhile.
+    With ``snapshot_dir`` set, the matrix is saved as .npy and memory-mapped on the
+    next start, so a restart with an unchanged table skips the reload.
+    """
+
+    def __init__(self,
+                 db_manager,
+                 table_name: str = 'airline_policies',
+                 sync_interval: float = float(os.getenv('POLICY_INDEX_SYNC_INTERVAL', 30)),
+                 snapshot_dir: Optional[str] = os.getenv('POLICY_INDEX_DIR')):
+        self.db_manager = db_manager
+        self.table_name = table_name
+        self.sync_interval = sync_interval
+        self.snapshot_dir = snapshot_dir
+        self.index: Optional[LocalVectorIndex] = None
+        self.version: Optional[Tuple[int, str]] = None
+        self._last_sync = 0.0
+        self._sync_lock = threading.Lock()
+
+    def get_index(self) -> Optional[LocalVectorIndex]:
+        """Current index, refreshed if the table changed; None if it cannot be loaded"""
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            # Only one thread syncs; the rest serve the current index unless there is none yet
+            if self._sync_lock.acquire(blocking=self.index is None):
+                try:
+                    if time.monotonic() - self._last_sync >= self.sync_interval:
+                        self.sync()
+                finally:
+                    self._sync_lock.release()
+        return self.index
+
+    def sync(self) -> None:
+        try:
+            version = self._watermark()
+            if version != self.version or self.index is None:
+                self.index = self._load_snapshot(version) or self._load_table(version)
+                self.version = version
+                logger.info(f"Policy index synced: {len(self.index)} rows, version {version}")
+        except Exception as e:
+            logger.warning(f"Policy index sync failed: {e}")
+        finally:
+            self._last_sync = time.monotonic()
+
+    def _watermark(self) -> Tuple[int, str]:
+        rows = self.db_manager.execute_query(
+            f"SELECT COUNT(*) AS row_count, MAX(update_time) AS updated FROM {self.table_name}"
+        )
+        return int(rows[0].row_count), str(rows[0].updated)
+
+    def _load_table(self, version: Tuple[int, str]) -> LocalVectorIndex:
+        rows = self.db_manager.execute_query(f"SELECT id, document, meta, embedding FROM {self.table_name}")
+        ids = [row.id for row in rows]
+        documents = [row.document for row in rows]
+        metadatas = [json.loads(row.meta) if isinstance(row.meta, str) else (row.meta or {}) for row in rows]
+        embeddings = np.array([_parse_vector(row.embedding) for row in rows], dtype=np.float32)
+        index = LocalVectorIndex(ids, documents, metadatas, embeddings)
+        self._save_snapshot(index, version)
+        return index
+
+    def _load_snapshot(self, version: Tuple[int, str]) -> Optional[LocalVectorIndex]:
+        if not self.snapshot_dir:
+            return None
+        meta_path = os.path.join(self.snapshot_dir, f"{self.table_name}.json")
+        try:
+            with open(meta_path, 'r') as f:
+                snapshot = json.load(f)
+            if tuple(snapshot['version']) != version or 'matrix' not in snapshot:
+                return None
+            matrix = np.load(os.path.join(self.snapshot_dir, snapshot['matrix']), mmap_mode='r')
+        except FileNotFoundError:
+            # No snapshot yet, or a newer one replaced this matrix after we read the metadata
+            return None
+        if matrix.shape[0] != len(snapshot['ids']):
+            return None
+        return LocalVectorIndex(snapshot['ids'], snapshot['documents'], snapshot['metadatas'], matrix, normalized=True)
+
+    def _save_snapshot(self, index: LocalVectorIndex, version: Tuple[int, str]) -> None:
+        """Write the snapshot without disturbing processes that have the previous one mapped.
+
+        Each version's matrix gets its own file and the metadata naming it is swapped in
+        last, both via os.replace, so readers see either the old snapshot or the new one.
+        Old matrices are unlinked, never rewritten; existing mappings of them stay valid.
+        """
+        if not self.snapshot_dir:
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        matrix_name = f"{self.table_name}.{os.getpid()}.{time.time_ns()}.npy"
+        matrix_path = os.path.join(self.snapshot_dir, matrix_name)
+        meta_path = os.path.join(self.snapshot_dir, f"{self.table_name}.json")
+
+        with open(f"{matrix_path}.tmp", 'wb') as f:
+            np.save(f, index.matrix)
+        os.replace(f"{matrix_path}.tmp", matrix_path)
+        meta_tmp = f"{meta_path}.{os.getpid()}.tmp"
+        with open(meta_tmp, 'w') as f:
+            json.dump({
+                'version': list(version),
+                'matrix': matrix_name,
+                'ids': index.ids,
+                'documents': index.documents,
+                'metadatas': index.metadatas
+            }, f)
+        os.replace(meta_tmp, meta_path)
+
+        for name in os.listdir(self.snapshot_dir):
+            if name.startswith(f"{self.table_name}.") and name.endswith('.npy') and name != matrix_name:
+                try:
+                    os.remove(os.path.join(self.snapshot_dir, name))
+                except FileNotFoundError:
+                    pass